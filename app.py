@@ -1,27 +1,96 @@
-from flask import Flask
+import click
+from flask import Flask, jsonify
 from flask_cors import CORS
-from models import Base, engine
+from config import Config
+from models import configure_database, init_db, shard_names, get_shard_session, TenantMoving
 from auth.auth import auth_bp
 from schools import schools_bp
 from events import events_bp
 from students import students_bp
 from face_encodings import face_encodings_bp
+from metrics import metrics_bp, init_metrics
+from profiling import init_profiling
+from logging_config import init_logging
 
-app = Flask(__name__)
 
-# Enable CORS for all routes
-CORS(app)
+def create_app(config=Config):
+    """Build the Flask app. No database connection is made until the first query."""
+    app = Flask(__name__)
+    app.config.from_object(config)
+    configure_database(config)
 
-# Register Blueprints
-app.register_blueprint(auth_bp)
-app.register_blueprint(schools_bp)
-app.register_blueprint(events_bp)
-app.register_blueprint(students_bp)
-app.register_blueprint(face_encodings_bp)
+    # Enable CORS for all routes
+    CORS(app)
 
-# Reflect existing tables in the database
+    init_logging(app)
+    init_metrics(app)
+    init_profiling(app)
 
+    # Register Blueprints
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(schools_bp)
+    app.register_blueprint(events_bp)
+    app.register_blueprint(students_bp)
+    app.register_blueprint(face_encodings_bp)
+    app.register_blueprint(metrics_bp)
+
+    # Organizations being moved between shards (rebalance_shards.py) are unavailable for a moment
+    @app.errorhandler(TenantMoving)
+    def tenant_moving(error):
+        return jsonify({"message": str(error)}), 503, {"Retry-After": str(app.config["SHARD_ROUTING_TTL"])}
+
+    # Schema creation is an explicit deployment step: flask --app app init-db
+    @app.cli.command("init-db")
+    def init_db_command():
+        init_db()
+        click.echo(f"Created tables on shards: {', '.join(shard_names())}")
+        click.echo("Now run `alembic upgrade head` (and `alembic -x shard=<name> upgrade head` per shard).")
+
+    # Backfill per-student centroids before turning FACE_PROTOTYPES on for existing data
+    @app.cli.command("rebuild-prototypes")
+    def rebuild_prototypes_command():
+        from face_encodings.matching import rebuild_prototypes
+        for shard_name in shard_names():
+            session = get_shard_session(shard_name)
+            try:
+                count = rebuild_prototypes(session)
+                session.commit()
+            finally:
+                session.close()
+            click.echo(f"{shard_name}: rebuilt prototypes for {count} users")
+
+    # Register accounts created before the login directory existed (run once after enabling SHARDS)
+    @app.cli.command("backfill-logins")
+    def backfill_logins_command():
+        from sqlalchemy import select
+        from models import AccountLogin, UserAccount, SessionLocal
+        directory = SessionLocal()
+        try:
+            known = dict(directory.execute(select(AccountLogin.user_login, AccountLogin.organization_id)).all())
+            for shard_name in shard_names():
+                session = get_shard_session(shard_name)
+                try:
+                    accounts = session.execute(select(UserAccount.user_login, UserAccount.organization_id)).all()
+                finally:
+                    session.close()
+
+                added = 0
+                for user_login, organization_id in accounts:
+                    if organization_id is None:
+                        continue  # unrouted accounts are found on the default shard anyway
+                    if user_login not in known:
+                        directory.add(AccountLogin(user_login=user_login, organization_id=organization_id))
+                        known[user_login] = organization_id
+                        added += 1
+                    elif known[user_login] != organization_id:
+                        click.echo(f"{shard_name}: login '{user_login}' is also used by organization {known[user_login]}")
+                directory.commit()
+                click.echo(f"{shard_name}: registered {added} logins")
+        finally:
+            directory.close()
+
+    return app
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -1 +1 @@
-from .auth import token_required, role_required, login
+from .auth import token_required, role_required, login, bearer_token, decode_token
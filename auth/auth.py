@@ -1,9 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from functools import wraps
-from models import UserAccount, UserRole, session
+from models import UserAccount, UserRole, TenantMoving, organization_for_login, session_for_organization
 import jwt
 import datetime
-from config import Config
 from flask_cors import CORS  # Import CORS
 
 # Create Blueprint for auth
@@ -12,19 +11,33 @@ auth_bp = Blueprint('auth', __name__)
 # Enable CORS only for the login route
 CORS(auth_bp, resources={r"/login": {"origins": "http://localhost:3000"}})
 
+# Token helpers, shared with the ASGI ingestion service
+def bearer_token(auth_header):
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]  # Extract token after Bearer
+    return None
+
+def decode_token(token, secret_key):
+    return jwt.decode(token, secret_key, algorithms=["HS256"])
+
 # Token verification decorator
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]  # Extract token after Bearer
-        else:
+        token = bearer_token(request.headers.get('Authorization'))
+        if not token:
             return jsonify({"message": "Token is missing!"}), 403
 
         try:
-            data = jwt.decode(token, Config.SECRET_KEY, algorithms=["HS256"])
-            current_user = session.query(UserAccount).filter_by(id=data['user_id']).first()
+            data = decode_token(token, current_app.config["SECRET_KEY"])
+            # The account lives on its organization's shard
+            session = session_for_organization(data.get('organization_id'))
+            try:
+                current_user = session.query(UserAccount).filter_by(id=data['user_id']).first()
+            finally:
+                session.close()
+        except TenantMoving:
+            raise  # answered with 503 by the app's error handler
         except Exception as e:
             return jsonify({"message": f"Token is invalid! {str(e)}"}), 403
         return f(current_user, *args, **kwargs)
@@ -46,8 +59,12 @@ def role_required(*roles):  # Accept multiple roles as arguments
 def login():
     data = request.get_json()
     
-    # Retrieve the user by username
-    user = session.query(UserAccount).filter_by(user_login=data.get('login')).first()
+    # Retrieve the user by username on the shard the login directory points to
+    session = session_for_organization(organization_for_login(data.get('login')))
+    try:
+        user = session.query(UserAccount).filter_by(user_login=data.get('login')).first()
+    finally:
+        session.close()
 
     # Check if user exists and if the provided password matches the stored password
     if user and user.password_hash == data.get('password'):
@@ -56,9 +73,10 @@ def login():
             {
                 'user_id': user.id,
                 'login': user.user_login,  # Include username in the JWT token payload
+                'organization_id': user.organization_id,  # Used to route requests to the tenant shard
                 'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
             },
-            Config.SECRET_KEY,
+            current_app.config["SECRET_KEY"],
             algorithm="HS256"
         )
         
@@ -0,0 +1 @@
+from .results import SCHEMA_VERSION, summarize, write_results, load_results
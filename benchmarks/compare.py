@@ -0,0 +1,53 @@
+"""Compare two benchmark result files and fail on regressions.
+
+    python -m benchmarks.compare base.json new.json [--metric p95_ms] [--threshold 0.10]
+
+Exits with status 1 when any benchmark present in both files got worse by more than
+--threshold (a fraction of the base value), or started returning errors. Latencies get
+worse when they grow, throughput (requests_per_second) when it drops.
+"""
+import argparse
+import sys
+
+from benchmarks.results import load_results
+
+# Metrics where a drop is the regression; every other metric is a latency
+HIGHER_IS_BETTER = {"requests_per_second"}
+
+
+def compare(base, new, metric, threshold):
+    """[(name, base value, new value, relative change, regressed)] for benchmarks in both runs."""
+    rows = []
+    for name, stats in new["benchmarks"].items():
+        if name not in base["benchmarks"]:
+            continue
+        before, after = base["benchmarks"][name][metric], stats[metric]
+        change = (after - before) / before if before else 0.0
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        regressed = worse > threshold or (stats["errors"] and not base["benchmarks"][name]["errors"])
+        rows.append((name, before, after, change, bool(regressed)))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--metric", default="p95_ms")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed regression as a fraction, e.g. 0.10")
+    args = parser.parse_args()
+
+    base, new = load_results(args.base), load_results(args.new)
+    if base["kind"] != new["kind"]:
+        parser.error(f"cannot compare {base['kind']} results with {new['kind']} results")
+
+    print(f"base {base['commit'] or '?'}  new {new['commit'] or '?'}  metric {args.metric}")
+    print(f"{'benchmark':<40} {'base':>10} {'new':>10} {'change':>8}")
+    rows = compare(base, new, args.metric, args.threshold)
+    for name, before, after, change, regressed in rows:
+        print(f"{name:<40} {before:>10.2f} {after:>10.2f} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
@@ -0,0 +1,110 @@
+"""Latency of every blueprint endpoint through the Flask test client (no network, one process).
+
+    python -m benchmarks.endpoints --iterations 50 --output endpoints.json [--only events]
+
+Uses the database and parameters from benchmark_seed.json (see benchmarks.seed).
+"""
+import argparse
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import numpy as np
+
+from app import create_app
+from benchmarks.results import print_table, summarize, write_results
+from benchmarks.seed import benchmark_config
+from benchmarks.synthetic import BENCHMARK_PASSWORD, admin_login, noisy, student_embedding, student_id
+
+
+def endpoint_cases(manifest, rng, import_rows=200):
+    """(name, method, path, request kwargs factory) for every endpoint worth timing."""
+    week_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
+
+    def probe():
+        student = int(rng.integers(manifest["students"]))
+        return {"json": {"embedding": noisy(student_embedding(manifest["seed"], 0, student), rng).tolist(),
+                         "camera_id": "benchmark"}}
+
+    def event():
+        return {"json": {"student_id": student_id(0, int(rng.integers(manifest["students"]))),
+                         "event_type": "STUDENT_ENTRANCE", "camera_id": "benchmark"}}
+
+    def roster():
+        batch = f"bench-import-{uuid4().hex[:12]}"  # logins must be new on every run
+        return {"json": {"students": [{"student_name": f"{batch}-{n}"} for n in range(import_rows)]}}
+
+    none = dict
+    return [
+        ("auth POST /login", "POST", "/login",
+         lambda: {"json": {"login": admin_login(0), "password": BENCHMARK_PASSWORD}}),
+        ("schools GET /schools", "GET", "/schools", none),
+        ("schools GET /schools/count", "GET", "/schools/count", none),
+        ("students GET /students", "GET", "/students", none),
+        ("students GET /students/count", "GET", "/students/count", none),
+        ("events GET /events/count", "GET", "/events/count", none),
+        ("events GET /events/weekly", "GET", "/events/weekly", none),
+        ("events GET /events/all (7 days)", "GET", f"/events/all?start={week_ago}", none),
+        ("events GET /events/entrance", "GET", "/events/entrance", none),
+        ("events GET /events/exit", "GET", "/events/exit", none),
+        ("events GET /events/danger", "GET", "/events/danger", none),
+        ("events GET /events/lying", "GET", "/events/lying", none),
+        ("events GET /events/irrelevant", "GET", "/events/irrelevant", none),
+        ("events POST /events", "POST", "/events", event),
+        ("face_encodings GET /face_encodings", "GET", "/face_encodings", none),
+        ("face_encodings POST /face_encodings/match", "POST", "/face_encodings/match", probe),
+        ("metrics GET /metrics", "GET", "/metrics", none),
+        # Last, so the students it adds do not slow down the read endpoints above
+        ("students POST /students/import", "POST", "/students/import", roster),
+    ]
+
+
+def run(manifest, iterations, warmup, only=None, import_rows=200):
+    app = create_app(benchmark_config(manifest["database_url"]))
+    client = app.test_client()
+
+    token = client.post("/login", json={"login": admin_login(0), "password": BENCHMARK_PASSWORD}).json["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    rng = np.random.default_rng(manifest["seed"])
+
+    benchmarks = {}
+    for name, method, path, make_kwargs in endpoint_cases(manifest, rng, import_rows):
+        if only and not name.startswith(only):
+            continue
+
+        latencies, errors = [], 0
+        for i in range(warmup + iterations):
+            kwargs = make_kwargs()
+            start = time.perf_counter()
+            response = client.open(path, method=method, headers=headers, **kwargs)
+            elapsed = time.perf_counter() - start
+            if i < warmup:
+                continue
+            latencies.append(elapsed)
+            errors += response.status_code >= 400
+        benchmarks[name] = summarize(latencies, errors)
+    return benchmarks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time every endpoint through the Flask test client")
+    parser.add_argument("--manifest", default="benchmark_seed.json")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", help="Only endpoints whose name starts with this (e.g. a blueprint name)")
+    parser.add_argument("--import-rows", type=int, default=200, help="Students per /students/import request")
+    parser.add_argument("--output", help="Write results as JSON (see benchmarks.results)")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)  # keep per-request log lines out of the timings' output
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    benchmarks = run(manifest, args.iterations, args.warmup, args.only, args.import_rows)
+    print_table(benchmarks)
+    if args.output:
+        write_results(args.output, "endpoints", benchmarks,
+                      {"seed": manifest, "iterations": args.iterations, "warmup": args.warmup,
+                       "import_rows": args.import_rows})
@@ -0,0 +1,85 @@
+"""Throughput of one ingestion path (Flask or the ASGI ingest app) under many concurrent cameras.
+
+Start the servers against the seeded database (see benchmarks.seed), run once per server
+and compare the two result files:
+
+    gunicorn -c gunicorn.conf.py -w 4 -b 127.0.0.1:5000
+    uvicorn --factory ingest:create_ingest_app --port 8000
+    python -m benchmarks.ingestion --url http://127.0.0.1:5000 --output flask.json
+    python -m benchmarks.ingestion --url http://127.0.0.1:8000 --auth-url http://127.0.0.1:5000 --output asgi.json
+    python -m benchmarks.compare flask.json asgi.json
+
+Unlike benchmarks.loadgen, every client posts back to back for --duration seconds over
+one keep-alive connection, to find the saturation point.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.loadgen import login
+from benchmarks.results import print_table, summarize, write_results
+from benchmarks.synthetic import noisy, student_embedding, student_id
+
+
+def payload(path, manifest, rng, camera_id):
+    student = int(rng.integers(manifest["students"]))
+    if path == "/events":
+        return {"student_id": student_id(0, student), "event_type": random.choice(["STUDENT_ENTRANCE", "STUDENT_EXIT"]),
+                "camera_id": camera_id}
+    return {"embedding": noisy(student_embedding(manifest["seed"], 0, student), rng).tolist(), "camera_id": camera_id}
+
+
+async def camera(client, path, manifest, number, deadline, latencies, errors):
+    rng = np.random.default_rng([manifest["seed"], number])
+    camera_id = f"ingestion-camera-{number}"
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.post(path, json=payload(path, manifest, rng, camera_id))
+            if response.status_code >= 400:
+                errors[0] += 1
+        except httpx.HTTPError:
+            errors[0] += 1
+        latencies.append(time.perf_counter() - start)
+
+
+async def main(args, manifest):
+    token = await login(args.auth_url or args.url, 0)
+    latencies, errors = [], [0]
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.url, headers={"Authorization": f"Bearer {token}"},
+                                 limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            camera(client, args.path, manifest, number, deadline, latencies, errors) for number in range(args.clients)
+        ))
+        duration = time.perf_counter() - started
+
+    return {f"ingestion POST {args.path}": summarize(latencies, errors[0], duration)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Saturation benchmark of an ingestion endpoint")
+    parser.add_argument("--url", required=True, help="Flask (gunicorn) or ASGI ingest server")
+    parser.add_argument("--auth-url", help="Server with /login, if --url is the ASGI ingest app")
+    parser.add_argument("--manifest", default="benchmark_seed.json")
+    parser.add_argument("--path", default="/events", choices=["/events", "/face_encodings/match"])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--output", help="Write results as JSON (see benchmarks.results)")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    benchmarks = asyncio.run(main(args, manifest))
+    print_table(benchmarks)
+    if args.output:
+        parameters = {key: value for key, value in vars(args).items() if key != "output"}
+        write_results(args.output, "ingestion", benchmarks, {"seed": manifest, **parameters})
@@ -0,0 +1,111 @@
+"""Camera-fleet load generator against a running server (Flask via gunicorn, or the ASGI ingest app).
+
+    python -m benchmarks.loadgen --url http://127.0.0.1:5000 --cameras 200 --duration 60 --output loadgen.json
+
+Each camera watches one door of one seeded school. Students arrive as a Poisson process
+whose rate is multiplied by --burst-factor for --burst-length seconds every --burst-every
+seconds (the bell). For every arrival the camera sends --frames match requests with
+embeddings of the same student about 0.3 apart (the usual spread between video frames of
+one face), and then posts the entrance or exit event.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.results import print_table, summarize, write_results
+from benchmarks.synthetic import BENCHMARK_PASSWORD, admin_login, noisy, student_embedding, student_id
+
+
+def arrival_rate(args, elapsed):
+    in_burst = elapsed % args.burst_every < args.burst_length
+    return args.arrival_rate * (args.burst_factor if in_burst else 1)
+
+
+async def login(auth_url, org):
+    async with httpx.AsyncClient(base_url=auth_url, timeout=30) as client:
+        response = await client.post("/login", json={"login": admin_login(org), "password": BENCHMARK_PASSWORD})
+        response.raise_for_status()
+        return response.json()["token"]
+
+
+async def camera(client, args, manifest, number, token, started, deadline, latencies, errors):
+    org = number % manifest["organizations"]
+    camera_id = f"loadgen-camera-{number}"
+    event_type = "STUDENT_ENTRANCE" if number % 2 == 0 else "STUDENT_EXIT"
+    headers = {"Authorization": f"Bearer {token}"}
+    rng = np.random.default_rng([manifest["seed"], number])
+    choice = random.Random(number)
+
+    async def post(kind, path, payload):
+        start = time.perf_counter()
+        try:
+            response = await client.post(path, json=payload, headers=headers)
+            if response.status_code >= 400:
+                errors[kind] += 1
+        except httpx.HTTPError:
+            errors[kind] += 1
+        latencies[kind].append(time.perf_counter() - start)
+
+    while True:
+        now = time.perf_counter()
+        await asyncio.sleep(choice.expovariate(arrival_rate(args, now - started)))
+        if time.perf_counter() >= deadline:
+            return
+
+        student = choice.randrange(manifest["students"])
+        face = student_embedding(manifest["seed"], org, student)
+        for _ in range(args.frames):
+            await post("match", "/face_encodings/match",
+                       {"embedding": noisy(face, rng).tolist(), "camera_id": camera_id})
+        await post("event", "/events",
+                   {"student_id": student_id(org, student), "event_type": event_type, "camera_id": camera_id})
+
+
+async def main(args, manifest):
+    tokens = [await login(args.auth_url or args.url, org) for org in range(manifest["organizations"])]
+    latencies = {"match": [], "event": []}
+    errors = {"match": 0, "event": 0}
+
+    limits = httpx.Limits(max_connections=args.cameras, max_keepalive_connections=args.cameras)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            camera(client, args, manifest, number, tokens[number % len(tokens)], started, deadline, latencies, errors)
+            for number in range(args.cameras)
+        ))
+        duration = time.perf_counter() - started
+
+    benchmarks = {f"loadgen {kind}": summarize(latencies[kind], errors[kind], duration) for kind in latencies}
+    benchmarks["loadgen all"] = summarize(latencies["match"] + latencies["event"], sum(errors.values()), duration)
+    return benchmarks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate a fleet of cameras posting matches and events")
+    parser.add_argument("--url", required=True, help="Server receiving /events and /face_encodings/match")
+    parser.add_argument("--auth-url", help="Server with /login, if --url is the ASGI ingest app")
+    parser.add_argument("--manifest", default="benchmark_seed.json")
+    parser.add_argument("--cameras", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--frames", type=int, default=5, help="Match requests per arrival")
+    parser.add_argument("--arrival-rate", type=float, default=0.2, help="Arrivals per second per camera")
+    parser.add_argument("--burst-factor", type=float, default=10)
+    parser.add_argument("--burst-every", type=float, default=30, help="Seconds between bursts")
+    parser.add_argument("--burst-length", type=float, default=5, help="Seconds each burst lasts")
+    parser.add_argument("--output", help="Write results as JSON (see benchmarks.results)")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    benchmarks = asyncio.run(main(args, manifest))
+    print_table(benchmarks)
+    if args.output:
+        parameters = {key: value for key, value in vars(args).items() if key != "output"}
+        write_results(args.output, "loadgen", benchmarks, {"seed": manifest, **parameters})
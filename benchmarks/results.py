@@ -0,0 +1,86 @@
+"""Benchmark results format, shared by every benchmark so runs can be compared across commits.
+
+    {
+      "schema": 1,
+      "kind": "endpoints" | "loadgen" | ...,
+      "commit": "<git sha>", "created_at": "<iso time>",
+      "environment": {"python": ..., "platform": ..., "cpus": ...},
+      "parameters": {...},               # how the run was configured
+      "benchmarks": {
+        "<name>": {"count", "errors", "requests_per_second", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}
+      }
+    }
+"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+SCHEMA_VERSION = 1
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(latencies, errors=0, duration=None):
+    """Latencies in seconds; duration (wall clock) defaults to the sum of latencies."""
+    count = len(latencies)
+    duration = duration or sum(latencies)
+    return {
+        "count": count,
+        "errors": errors,
+        "requests_per_second": count / duration if duration else 0.0,
+        "mean_ms": sum(latencies) / count * 1000 if count else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies) * 1000 if count else 0.0,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def write_results(path, kind, benchmarks, parameters):
+    results = {
+        "schema": SCHEMA_VERSION,
+        "kind": kind,
+        "commit": git_commit(),
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "parameters": parameters,
+        "benchmarks": benchmarks,
+    }
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    return results
+
+
+def load_results(path):
+    with open(path) as f:
+        results = json.load(f)
+    if results.get("schema") != SCHEMA_VERSION:
+        raise ValueError(f"{path}: unsupported results schema {results.get('schema')}")
+    return results
+
+
+def print_table(benchmarks):
+    print(f"{'benchmark':<40} {'count':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, stats in benchmarks.items():
+        print(f"{name:<40} {stats['count']:>7} {stats['requests_per_second']:>9.1f} {stats['p50_ms']:>9.2f} "
+              f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['errors']:>7}")
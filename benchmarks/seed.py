@@ -0,0 +1,155 @@
+"""Seed a local database with synthetic organizations, students, face encodings and events.
+
+    python -m benchmarks.seed --database-url sqlite:///benchmark.db --organizations 5 \\
+        --students 500 --encodings 3 --events 1000000 --days 365
+
+On Postgres the schema is built as in a deployment (init-db, then `alembic upgrade head`),
+so events land in monthly partitions. Writes the parameters the other benchmarks need to
+benchmark_seed.json (--manifest).
+Re-running with the same arguments recreates the same data.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, time as clock, timedelta
+
+import numpy as np
+from sqlalchemy import insert, text
+
+from config import Config
+from models import (Base, EventType, UserRole, Organization, UserAccount, FaceEncoding, FacePrototype, Schedule,
+                    Event, configure_database, get_engine, init_db)
+from models.partitioning import add_months, create_event_partition, month_start
+from benchmarks.synthetic import (BENCHMARK_PASSWORD, admin_login, noisy, organization_id, student_embedding,
+                                  student_id)
+
+CHUNK = 10000
+
+# Mostly entrances and exits, with the occasional incident
+EVENT_WEIGHTS = {
+    EventType.STUDENT_ENTRANCE: 45,
+    EventType.STUDENT_EXIT: 45,
+    EventType.LYING_MAN: 4,
+    EventType.SMOKING: 3,
+    EventType.FIGHTING: 2,
+    EventType.WEAPON: 1,
+}
+
+
+def benchmark_config(database_url):
+    """Config pointing at the benchmark database, without tenant shards."""
+    return type("BenchmarkConfig", (Config,), {"SQLALCHEMY_DATABASE_URI": database_url, "SHARDS": {}})
+
+
+def insert_chunked(connection, model, rows):
+    for start in range(0, len(rows), CHUNK):
+        connection.execute(insert(model), rows[start:start + CHUNK])
+
+
+def create_schema(engine, database_url, days):
+    """Tables as a deployment has them: init-db, the migrations, then event partitions for the seeded months."""
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    Base.metadata.drop_all(engine)  # dropping the partitioned event table drops its partitions too
+    init_db()
+    if engine.dialect.name != "postgresql":
+        return  # the migrations only change Postgres
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=root, check=True,
+                   env={**os.environ, "DATABASE_URL": database_url, "SHARDS": "{}"})
+    with engine.begin() as connection:
+        now = datetime.utcnow()
+        month = month_start(now - timedelta(days=days))
+        while month <= now:
+            create_event_partition(connection, month)
+            month = add_months(month, 1)
+
+
+def seed(database_url, organizations, students, encodings, events, days, seed_value):
+    configure_database(benchmark_config(database_url))
+    engine = get_engine()
+    create_schema(engine, database_url, days)
+
+    rng = np.random.default_rng(seed_value)
+    choice = random.Random(seed_value)
+    now = datetime.utcnow()
+    event_types, weights = list(EVENT_WEIGHTS), list(EVENT_WEIGHTS.values())
+
+    with engine.begin() as connection:
+        for org in range(organizations):
+            org_id = organization_id(org)
+            connection.execute(insert(Organization), [{"id": org_id, "org_name": f"Benchmark School {org}"}])
+            connection.execute(insert(Schedule), [{
+                "id": f"bench-schedule-{org}", "organization_id": org_id,
+                "start_time": datetime.combine(now.date(), clock(8)),
+                "end_time": datetime.combine(now.date(), clock(15)),
+            }])
+
+            accounts = [{"id": f"bench-admin-{org}", "organization_id": org_id, "user_name": admin_login(org),
+                         "user_role": UserRole.ADMIN, "user_login": admin_login(org),
+                         "password_hash": BENCHMARK_PASSWORD}]
+            face_encodings, prototypes = [], []
+            for student in range(students):
+                sid = student_id(org, student)
+                accounts.append({"id": sid, "organization_id": org_id, "user_name": f"Student {org}-{student}",
+                                 "user_role": UserRole.STUDENT, "user_login": sid,
+                                 "password_hash": BENCHMARK_PASSWORD})
+                face = student_embedding(seed_value, org, student)
+                vectors = [noisy(face, rng) for _ in range(encodings)]
+                face_encodings += [{"id": f"{sid}-enc-{k}", "user_id": sid, "face_encoding": vector.tobytes()}
+                                   for k, vector in enumerate(vectors)]
+                if vectors:
+                    prototypes.append({"id": f"{sid}-proto", "user_id": sid,
+                                       "prototype": np.mean(vectors, axis=0).tobytes(), "encoding_count": len(vectors)})
+
+            insert_chunked(connection, UserAccount, accounts)
+            insert_chunked(connection, FaceEncoding, face_encodings)
+            insert_chunked(connection, FacePrototype, prototypes)
+
+    # Events are spread evenly over organizations and over the last `days` days
+    started = time.perf_counter()
+    per_org = events // organizations if organizations else 0
+    for org in range(organizations):
+        rows = []
+        for n in range(per_org):
+            rows.append({
+                "id": f"bench-event-{org}-{n}",
+                "event_type": choice.choices(event_types, weights)[0],
+                "organization_id": organization_id(org),
+                "timestamp": now - timedelta(seconds=choice.randrange(days * 86400)),
+                "student_id": student_id(org, choice.randrange(students)),
+                "camera_id": f"camera-{choice.randrange(8)}",
+            })
+            if len(rows) == CHUNK:
+                with engine.begin() as connection:
+                    connection.execute(insert(Event), rows)
+                rows = []
+        if rows:
+            with engine.begin() as connection:
+                connection.execute(insert(Event), rows)
+    print(f"Inserted {per_org * organizations} events in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Seed a benchmark database with synthetic data")
+    parser.add_argument("--database-url", default="sqlite:///benchmark.db")
+    parser.add_argument("--organizations", type=int, default=5)
+    parser.add_argument("--students", type=int, default=500, help="Students per organization")
+    parser.add_argument("--encodings", type=int, default=3, help="Face encodings per student")
+    parser.add_argument("--events", type=int, default=100000, help="Total events")
+    parser.add_argument("--days", type=int, default=365, help="Spread events over this many past days")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--manifest", default="benchmark_seed.json")
+    args = parser.parse_args()
+
+    if args.students < 1:
+        parser.error("--students must be at least 1")
+    seed(args.database_url, args.organizations, args.students, args.encodings, args.events, args.days, args.seed)
+    with open(args.manifest, "w") as f:
+        json.dump(vars(args), f, indent=2)
+    print(f"Seeded {args.database_url}; parameters written to {args.manifest}")
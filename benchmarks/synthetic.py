@@ -0,0 +1,30 @@
+"""Deterministic synthetic data shared by the seeder and the load generator.
+
+IDs and embeddings are derived from indexes and the seed, so the load generator can
+address seeded students without reading them back from the database.
+"""
+import numpy as np
+
+EMBEDDING_DIM = 128
+BENCHMARK_PASSWORD = "benchmark"
+
+
+def organization_id(org):
+    return f"bench-org-{org}"
+
+
+def admin_login(org):
+    return f"bench-admin-{org}"
+
+
+def student_id(org, student):
+    return f"bench-student-{org}-{student}"
+
+
+def student_embedding(seed, org, student):
+    """The 'true' face of a synthetic student; enrolment images and probes add noise to it."""
+    return np.random.default_rng([seed, org, student]).normal(0, 0.15, EMBEDDING_DIM)
+
+
+def noisy(embedding, rng, scale=0.02):
+    return embedding + rng.normal(0, scale, EMBEDDING_DIM)
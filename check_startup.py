@@ -0,0 +1,60 @@
+"""Import-time budget check: building the app must be fast and must not touch the database.
+
+    python check_startup.py [--budget 1.5]
+
+Runs in a fresh interpreter with an unreachable DATABASE_URL, so any connection,
+DDL or eager heavy import during startup shows up as a failure or a blown budget.
+Exits non-zero on failure, so it can gate CI or a deploy.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+from models import database
+print(json.dumps({
+    "import_seconds": imported - start,
+    "create_app_seconds": created - imported,
+    "engines": sorted(database._engines),
+    "heavy_modules": sorted(m for m in ("numpy", "face_recognition", "psycopg2") if m in sys.modules),
+}))
+"""
+
+
+def measure():
+    env = dict(os.environ, DATABASE_URL="postgresql://startup-check@127.0.0.1:1/none")
+    result = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check app startup time and laziness")
+    parser.add_argument("--budget", type=float, default=1.5, help="Max seconds for import + create_app")
+    args = parser.parse_args()
+
+    stats = measure()
+    total = stats["import_seconds"] + stats["create_app_seconds"]
+    print(f"import app: {stats['import_seconds']:.3f}s, create_app(): {stats['create_app_seconds']:.3f}s")
+
+    failures = []
+    if total > args.budget:
+        failures.append(f"startup took {total:.3f}s, budget is {args.budget:.3f}s")
+    if stats["engines"]:
+        failures.append(f"engines created during startup: {stats['engines']}")
+    if stats["heavy_modules"]:
+        failures.append(f"modules imported eagerly: {stats['heavy_modules']}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
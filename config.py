@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -6,3 +7,40 @@ class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "secret_key")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Root log level; logs go to stderr, and also to LOG_FILE when it is set
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FILE = os.getenv("LOG_FILE")
+    # Extra tenant shards as JSON: {"name": "url"} or {"name": {"url": ..., "schema": ...}}.
+    # DATABASE_URL is always the "default" shard and holds the routing table.
+    SHARDS = json.loads(os.getenv("SHARDS", "{}"))
+    SHARD_ROUTING_TTL = int(os.getenv("SHARD_ROUTING_TTL", "30"))
+    # Monthly event partitions (Postgres): how far ahead to create them and when to archive
+    EVENT_PARTITION_MONTHS_AHEAD = int(os.getenv("EVENT_PARTITION_MONTHS_AHEAD", "3"))
+    EVENT_RETENTION_MONTHS = int(os.getenv("EVENT_RETENTION_MONTHS", "12"))
+    EVENT_ARCHIVE_DIR = os.getenv("EVENT_ARCHIVE_DIR", "archive")
+    # Opt-in per-request SQL profiling (slow query log, N+1 detection, Server-Timing header)
+    SQL_PROFILING = os.getenv("SQL_PROFILING", "0").lower() in ("1", "true")
+    SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+    SQL_SERVER_TIMING = os.getenv("SQL_SERVER_TIMING", "0").lower() in ("1", "true")
+    SQL_PROFILE_TOP = int(os.getenv("SQL_PROFILE_TOP", "3"))
+    # Bulk student import / delete
+    STUDENT_IMPORT_MAX_ROWS = int(os.getenv("STUDENT_IMPORT_MAX_ROWS", "20000"))
+    STUDENT_BULK_CHUNK = int(os.getenv("STUDENT_BULK_CHUNK", "1000"))
+    # Face matching. FACE_PROTOTYPES keeps one centroid per student and searches those first;
+    # raw encodings are only consulted for matches within FACE_PROTOTYPE_MARGIN of a decision
+    FACE_MATCH_TOLERANCE = float(os.getenv("FACE_MATCH_TOLERANCE", "0.6"))
+    FACE_PROTOTYPES = os.getenv("FACE_PROTOTYPES", "0").lower() in ("1", "true")
+    FACE_PROTOTYPE_MARGIN = float(os.getenv("FACE_PROTOTYPE_MARGIN", "0.08"))
+    FACE_PROTOTYPE_CANDIDATES = int(os.getenv("FACE_PROTOTYPE_CANDIDATES", "5"))
+    FACE_PROTOTYPE_OUTLIER_DISTANCE = float(os.getenv("FACE_PROTOTYPE_OUTLIER_DISTANCE", "0.6"))
+    # Per-camera recent-match cache in front of the gallery search: the last FACE_MATCH_CACHE_RECENT
+    # identities of up to FACE_MATCH_CACHE_SIZE cameras are tried first, and a frame within
+    # FACE_MATCH_CACHE_VERIFY_DISTANCE of one is taken as that student without the full search
+    FACE_MATCH_CACHE = os.getenv("FACE_MATCH_CACHE", "1").lower() in ("1", "true")
+    FACE_MATCH_CACHE_SIZE = int(os.getenv("FACE_MATCH_CACHE_SIZE", "10000"))
+    FACE_MATCH_CACHE_TTL = float(os.getenv("FACE_MATCH_CACHE_TTL", "10"))
+    FACE_MATCH_CACHE_RECENT = int(os.getenv("FACE_MATCH_CACHE_RECENT", "4"))
+    FACE_MATCH_CACHE_VERIFY_DISTANCE = float(os.getenv("FACE_MATCH_CACHE_VERIFY_DISTANCE", "0.4"))
+    # ASGI ingestion service (ingest/): connections per async Postgres pool
+    INGEST_DB_POOL_SIZE = int(os.getenv("INGEST_DB_POOL_SIZE", "20"))
@@ -0,0 +1,42 @@
+"""Event table maintenance for every shard. Run it from cron, e.g. daily:
+
+    python event_maintenance.py partitions   # create the upcoming monthly partitions
+    python event_maintenance.py retention    # archive and drop partitions past EVENT_RETENTION_MONTHS
+"""
+import argparse
+import logging
+
+from models import shard_names, get_shard_engine
+from models.partitioning import ensure_event_partitions
+from events.archive import archive_old_partitions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def create_partitions(months_ahead=None):
+    for shard_name in shard_names():
+        with get_shard_engine(shard_name).begin() as connection:
+            created = ensure_event_partitions(connection, months_ahead)
+        logger.info(f"{shard_name}: created partitions {created or 'none'}")
+
+
+def apply_retention(retention_months=None):
+    for shard_name in shard_names():
+        archived = archive_old_partitions(get_shard_engine(shard_name), shard_name, retention_months)
+        logger.info(f"{shard_name}: archived {len(archived)} partitions")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Event partition maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    partitions_parser = subparsers.add_parser("partitions", help="Create future monthly partitions")
+    partitions_parser.add_argument("--months-ahead", type=int, default=None)
+    retention_parser = subparsers.add_parser("retention", help="Archive and drop old partitions")
+    retention_parser.add_argument("--retention-months", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "partitions":
+        create_partitions(args.months_ahead)
+    else:
+        apply_retention(args.retention_months)
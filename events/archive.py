@@ -0,0 +1,114 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import text
+from models.database import get_config
+from models.partitioning import (add_months, month_start, qualified, is_partitioned, list_event_partitions,
+                                drop_event_partition)
+
+ARCHIVE_COLUMNS = ("id", "event_type", "organization_id", "timestamp", "student_id", "camera_id")
+
+
+def archive_dir(shard_name):
+    return os.path.join(get_config().EVENT_ARCHIVE_DIR, shard_name)
+
+
+def load_manifest(shard_name):
+    path = os.path.join(archive_dir(shard_name), "manifest.json")
+    if not os.path.exists(path):
+        return {"partitions": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(shard_name, manifest):
+    path = os.path.join(archive_dir(shard_name), "manifest.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)  # never leave a half-written manifest behind
+
+
+def export_partition(connection, shard_name, name, month):
+    """Write every row of a partition to a gzipped JSON-lines file and return its manifest entry."""
+    os.makedirs(archive_dir(shard_name), exist_ok=True)
+    file_name = f"{name}.jsonl.gz"
+    path = os.path.join(archive_dir(shard_name), file_name)
+
+    rows = 0
+    checksum = hashlib.sha256()
+    result = connection.execute(
+        text(f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM {qualified(connection, name)}")
+        .execution_options(stream_results=True, yield_per=5000)
+    )
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for row in result.mappings():
+            record = dict(row)
+            record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+            line = json.dumps(record) + "\n"
+            f.write(line)
+            checksum.update(line.encode("utf-8"))
+            rows += 1
+
+    return {
+        "partition": name,
+        "month": f"{month:%Y-%m}",
+        "file": file_name,
+        "rows": rows,
+        "sha256": checksum.hexdigest(),
+        "archived_at": datetime.utcnow().isoformat(),
+    }
+
+
+def archive_old_partitions(engine, shard_name, retention_months=None, now=None):
+    """Export and drop monthly partitions older than the retention window."""
+    if retention_months is None:
+        retention_months = get_config().EVENT_RETENTION_MONTHS
+    cutoff = add_months(month_start(now or datetime.utcnow()), -retention_months)
+
+    with engine.connect() as connection:
+        if not is_partitioned(connection):
+            return []
+        partitions = list_event_partitions(connection)
+
+    archived = []
+    for month, name in sorted(partitions.items()):
+        if month >= cutoff:
+            continue
+
+        with engine.begin() as connection:
+            entry = export_partition(connection, shard_name, name, month)
+            drop_event_partition(connection, name)
+            # Saved last so a failure here rolls the drop back
+            manifest = load_manifest(shard_name)
+            manifest["partitions"] = [p for p in manifest["partitions"] if p["partition"] != name] + [entry]
+            save_manifest(shard_name, manifest)
+
+        logging.info(f"Archived {entry['rows']} events from {shard_name}.{name}")
+        archived.append(entry)
+    return archived
+
+
+def read_archived_events(shard_name, organization_id, start=None, end=None, event_types=None):
+    """Yield archived events of one organization with start <= timestamp < end."""
+    for entry in load_manifest(shard_name)["partitions"]:
+        month = datetime.strptime(entry["month"], "%Y-%m")
+        if (end and month >= end) or (start and add_months(month, 1) <= start):
+            continue
+
+        with gzip.open(os.path.join(archive_dir(shard_name), entry["file"]), "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["organization_id"] != organization_id:
+                    continue
+                if event_types and record["event_type"] not in event_types:
+                    continue
+                timestamp = datetime.fromisoformat(record["timestamp"])
+                if (start and timestamp < start) or (end and timestamp >= end):
+                    continue
+                record["timestamp"] = timestamp
+                yield record
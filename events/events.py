@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
-from models import Event, EventType, UserAccount, Schedule, SessionLocal
+from models import Event, EventType, UserAccount, Schedule, session_for_organization, shard_for_organization
+from events.archive import read_archived_events
+from metrics import EVENTS_INGESTED
 from auth.auth import token_required, role_required
 from datetime import datetime, timedelta
 from sqlalchemy.exc import SQLAlchemyError
@@ -8,15 +10,16 @@ from uuid import uuid4
 
 events_bp = Blueprint('events', __name__)
 
-def get_session():
-    return SessionLocal()
+# Resolve the session on the shard holding the user's organization
+def get_session(current_user):
+    return session_for_organization(current_user.organization_id)
 
 # Add an event (e.g., entrance or exit)
 @events_bp.route('/events', methods=['POST'])
 @token_required
 @role_required("ADMIN")
 def add_event(current_user):
-    session = get_session()
+    session = get_session(current_user)
     data = request.get_json()
 
     try:
@@ -25,23 +28,27 @@ def add_event(current_user):
         if not student or student.organization_id != current_user.organization_id:
             return jsonify({"message": "Student not found or not in this organization"}), 404
 
-        event_type = data.get('event_type', '').upper()
-        if event_type not in [et.name for et in EventType]:
+        event_type = EventType.parse(data.get('event_type'))
+        if not event_type:
             return jsonify({"message": "Invalid event type"}), 400
 
+        try:
+            timestamp = datetime.fromisoformat(data['timestamp']) if data.get('timestamp') else datetime.utcnow()
+        except (TypeError, ValueError):
+            return jsonify({"message": "Invalid timestamp"}), 400
+
         new_event = Event(
             id=str(uuid4()),
             organization_id=current_user.organization_id,
             student_id=student.id,
-            event_type=EventType[event_type],
-            timestamp=data.get('timestamp', datetime.utcnow()),
-            camera_id=data.get('camera_id'),
-            created_at=datetime.utcnow(),
-            last_updated=datetime.utcnow()
+            event_type=event_type,
+            timestamp=timestamp,
+            camera_id=data.get('camera_id')
         )
 
         session.add(new_event)
         session.commit()
+        EVENTS_INGESTED.labels(event_type.name).inc()
         return jsonify({"message": "Event added", "event_id": new_event.id}), 201
 
     except SQLAlchemyError as e:
@@ -56,17 +63,31 @@ def add_event(current_user):
 @token_required
 @role_required("ADMIN")
 def get_all_events(current_user):
-    session = get_session()
+    # Optional ISO date range (start inclusive, end exclusive) lets Postgres prune partitions
     try:
-        events = session.query(
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({"message": "Invalid start or end date"}), 400
+    include_archived = request.args.get('include_archived', '').lower() in ('1', 'true')
+
+    session = get_session(current_user)
+    try:
+        # Outer join: events without a student (danger events, deleted students) are listed with no name
+        query = session.query(
             Event.id.label("event_id"),
             Event.timestamp,
             Event.event_type,
             Event.camera_id,
             UserAccount.user_name.label("student_name")
-        ).join(UserAccount, Event.student_id == UserAccount.id).filter(
+        ).outerjoin(UserAccount, Event.student_id == UserAccount.id).filter(
             Event.organization_id == current_user.organization_id
-        ).all()
+        )
+        if start:
+            query = query.filter(Event.timestamp >= start)
+        if end:
+            query = query.filter(Event.timestamp < end)
+        events = query.all()
 
         response = [{
             "event_id": event.event_id,
@@ -76,6 +97,25 @@ def get_all_events(current_user):
             "student_name": event.student_name
         } for event in events]
 
+        # Months dropped by the retention job are read back from the compressed archive
+        if include_archived:
+            archived = list(read_archived_events(
+                shard_for_organization(current_user.organization_id),
+                current_user.organization_id, start, end
+            ))
+            student_ids = {event["student_id"] for event in archived if event["student_id"]}
+            names = dict(session.query(UserAccount.id, UserAccount.user_name).filter(
+                UserAccount.id.in_(student_ids)
+            ).all()) if student_ids else {}
+
+            response += [{
+                "event_id": event["id"],
+                "timestamp": event["timestamp"].isoformat(),
+                "event_type": event["event_type"],
+                "camera_id": event["camera_id"],
+                "student_name": names.get(event["student_id"])
+            } for event in archived]
+
         return jsonify(response), 200
     finally:
         session.close()
@@ -85,7 +125,7 @@ def get_all_events(current_user):
 @token_required
 @role_required("ADMIN")
 def get_irrelevant_logs(current_user):
-    session = get_session()
+    session = get_session(current_user)
     try:
         schedule = session.query(Schedule).filter_by(organization_id=current_user.organization_id).first()
         if not schedule:
@@ -97,7 +137,7 @@ def get_irrelevant_logs(current_user):
             Event.event_type,
             Event.camera_id,
             UserAccount.user_name.label("student_name")
-        ).join(UserAccount, Event.student_id == UserAccount.id).filter(
+        ).outerjoin(UserAccount, Event.student_id == UserAccount.id).filter(
             Event.organization_id == current_user.organization_id,
             Event.event_type == EventType.STUDENT_ENTRANCE
         ).all()
@@ -124,7 +164,7 @@ def get_irrelevant_logs(current_user):
 @token_required
 @role_required("ADMIN")
 def get_danger_logs(current_user):
-    session = get_session()
+    session = get_session(current_user)
     try:
         events = session.query(
             Event.id.label("event_id"),
@@ -132,7 +172,7 @@ def get_danger_logs(current_user):
             Event.event_type,
             Event.camera_id,
             UserAccount.user_name.label("student_name")
-        ).join(UserAccount, Event.student_id == UserAccount.id).filter(
+        ).outerjoin(UserAccount, Event.student_id == UserAccount.id).filter(
             Event.organization_id == current_user.organization_id,
             Event.event_type.in_([EventType.FIGHTING, EventType.SMOKING, EventType.WEAPON])
         ).all()
@@ -154,7 +194,7 @@ def get_danger_logs(current_user):
 @token_required
 @role_required("ADMIN")
 def get_entrance_logs(current_user):
-    session = get_session()
+    session = get_session(current_user)
     try:
         events = session.query(
             Event.id.label("event_id"),
@@ -162,7 +202,7 @@ def get_entrance_logs(current_user):
             Event.event_type,
             Event.camera_id,
             UserAccount.user_name.label("student_name")
-        ).join(UserAccount, Event.student_id == UserAccount.id).filter(
+        ).outerjoin(UserAccount, Event.student_id == UserAccount.id).filter(
             Event.organization_id == current_user.organization_id,
             Event.event_type == EventType.STUDENT_ENTRANCE
         ).all()
@@ -183,7 +223,7 @@ def get_entrance_logs(current_user):
 @token_required
 @role_required("ADMIN")
 def get_exit_logs(current_user):
-    session = get_session()
+    session = get_session(current_user)
     try:
         events = session.query(
             Event.id.label("event_id"),
@@ -191,7 +231,7 @@ def get_exit_logs(current_user):
             Event.event_type,
             Event.camera_id,
             UserAccount.user_name.label("student_name")
-        ).join(UserAccount, Event.student_id == UserAccount.id).filter(
+        ).outerjoin(UserAccount, Event.student_id == UserAccount.id).filter(
             Event.organization_id == current_user.organization_id,
             Event.event_type == EventType.STUDENT_EXIT
         ).all()
@@ -213,7 +253,7 @@ def get_exit_logs(current_user):
 @token_required
 @role_required("ADMIN")
 def get_lying_man(current_user):
-    session = get_session()
+    session = get_session(current_user)
     try:
         events = session.query(
             Event.id.label("event_id"),
@@ -221,7 +261,7 @@ def get_lying_man(current_user):
             Event.event_type,
             Event.camera_id,
             UserAccount.user_name.label("student_name")
-        ).join(UserAccount, Event.student_id == UserAccount.id).filter(
+        ).outerjoin(UserAccount, Event.student_id == UserAccount.id).filter(
             Event.organization_id == current_user.organization_id,
             Event.event_type == EventType.LYING_MAN
         ).all()
@@ -243,7 +283,7 @@ def get_lying_man(current_user):
 @token_required
 @role_required("ADMIN", "STAFF")
 def events_count(current_user):
-    session = get_session()
+    session = get_session(current_user)
     try:
         count = session.query(Event).filter_by(
             organization_id=current_user.organization_id
@@ -257,7 +297,7 @@ def events_count(current_user):
 @token_required
 @role_required("ADMIN")
 def get_weekly_events(current_user):
-    session = get_session()
+    session = get_session(current_user)
     try:
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=6)
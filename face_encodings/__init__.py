@@ -1 +1 @@
-from .face_encodings import face_encodings_bp,get_users_with_encodings,add_encoding
\ No newline at end of file
+from .face_encodings import face_encodings_bp,get_users_with_encodings,add_encoding,match_face
\ No newline at end of file
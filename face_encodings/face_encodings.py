@@ -1,21 +1,23 @@
-from flask import Blueprint, jsonify, request
-from models import FaceEncoding, UserAccount, SessionLocal
+from flask import Blueprint, current_app, jsonify, request
+from models import FaceEncoding, FacePrototype, UserAccount, session_for_organization
 from auth.auth import token_required, role_required
+from metrics import FACE_ENCODINGS_ADDED, FACE_ENCODINGS_REJECTED, FACE_MATCHES
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 from uuid import uuid4
 
 face_encodings_bp = Blueprint('face_encodings', __name__)
 
-def get_session():
-    return SessionLocal()
+# Resolve the session on the shard holding the user's organization
+def get_session(current_user):
+    return session_for_organization(current_user.organization_id)
 
 # Get all users with face encodings for the current organization
 @face_encodings_bp.route('/face_encodings', methods=['GET'])
 @token_required
 @role_required("ADMIN")
 def get_users_with_encodings(current_user):
-    session = get_session()
+    session = get_session(current_user)
     try:
         # Join FaceEncoding with UserAccount to fetch usernames of users with encodings
         users_with_encodings = session.query(UserAccount.user_name).join(FaceEncoding).filter(
@@ -40,7 +42,7 @@ def get_users_with_encodings(current_user):
 @token_required
 @role_required("ADMIN")
 def add_encoding(current_user):
-    session = get_session()
+    session = get_session(current_user)
     if 'file' not in request.files:
         return jsonify({"error": "No file provided"}), 400
 
@@ -72,6 +74,19 @@ def add_encoding(current_user):
         face_encoding = face_encodings[0]
         binary_data = face_encoding.tobytes()
 
+        # Prototype mode: reject enrolment images that do not look like the student's other
+        # images, then fold the new encoding into the student's centroid
+        if current_app.config['FACE_PROTOTYPES']:
+            from face_encodings.matching import face_distance, update_prototype
+            prototype = session.query(FacePrototype).filter_by(user_id=user.id).with_for_update().first()
+            if prototype:
+                distance = float(face_distance(prototype.embedding[None, :], face_encoding)[0])
+                if distance > current_app.config['FACE_PROTOTYPE_OUTLIER_DISTANCE']:
+                    FACE_ENCODINGS_REJECTED.inc()
+                    return jsonify({"error": "Face does not match the user's existing encodings",
+                                    "distance": distance}), 400
+            update_prototype(session, user.id, face_encoding, prototype)
+
         # Save the encoding in the database
         new_encoding = FaceEncoding(
             id=str(uuid4()),
@@ -80,6 +95,7 @@ def add_encoding(current_user):
         )
         session.add(new_encoding)
         session.commit()
+        FACE_ENCODINGS_ADDED.inc()
 
         return jsonify({"message": "Face encoding added successfully"}), 201
 
@@ -89,3 +105,43 @@ def add_encoding(current_user):
         return jsonify({"error": "Database error occurred"}), 500
     finally:
         session.close()
+
+def read_probe():
+    """Probe embedding from a JSON {"embedding": [...]} body or an uploaded image."""
+    if 'file' in request.files:
+        import face_recognition
+        face_encodings = face_recognition.face_encodings(face_recognition.load_image_file(request.files['file']))
+        return face_encodings[0] if face_encodings else None
+
+    from face_encodings.matching import parse_embedding
+    data = request.get_json(silent=True)
+    return parse_embedding(data.get('embedding') if isinstance(data, dict) else None)
+
+# Match a face against the students of the current organization
+@face_encodings_bp.route('/face_encodings/match', methods=['POST'])
+@token_required
+@role_required("ADMIN")
+def match_face(current_user):
+    from face_encodings.match_cache import cached_match
+
+    probe = read_probe()
+    if probe is None:
+        return jsonify({"error": "Provide an image with a face or a 128-value embedding"}), 400
+
+    session = get_session(current_user)
+    try:
+        # Consecutive frames from one camera usually show the same face: try the recent-match cache first
+        camera_id = request.form.get('camera_id') or (request.get_json(silent=True) or {}).get('camera_id')
+        user_id, distance = cached_match(session, current_user.organization_id, camera_id, probe, current_app.config)
+        FACE_MATCHES.labels("match" if user_id else "no_match").inc()
+        if not user_id:
+            return jsonify({"match": False, "distance": distance}), 200
+
+        user = session.query(UserAccount).filter_by(id=user_id).first()
+        return jsonify({"match": True, "user_id": user_id, "user_name": user.user_name, "distance": distance}), 200
+
+    except SQLAlchemyError as e:
+        logging.error(f"Error matching face: {str(e)}")
+        return jsonify({"error": "Database error occurred"}), 500
+    finally:
+        session.close()
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import FACE_MATCH_CACHE_REQUESTS, FACE_MATCH_CACHE_SIZE
+from face_encodings.matching import identity_distances, match_embedding_steps, run_steps
+
+
+class MatchCache:
+    """The last few identities matched on each camera, most recent first.
+
+    Consecutive frames on one camera usually show someone it has just matched, so the
+    probe is first compared with those students' own vectors. This does not depend on
+    frames being near-identical: any frame within tolerance of a recent identity is a hit.
+    """
+
+    def __init__(self, max_size, ttl, recent=4):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.recent_size = recent
+        # (organization_id, camera_id) -> [(user_id, expires_at), ...]; ordered by last match,
+        # so the cameras that expire first are at the front
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._entries:
+            key, identities = next(iter(self._entries.items()))
+            if identities[0][1] >= now:
+                break
+            del self._entries[key]
+
+    def _update_size(self):
+        FACE_MATCH_CACHE_SIZE.set(len(self._entries))
+
+    def recent(self, key):
+        """User IDs recently matched on the camera, most recent first."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            identities = [user_id for user_id, expires_at in self._entries.get(key, ()) if expires_at >= now]
+            self._update_size()
+            return identities
+
+    def put(self, key, user_id):
+        now = time.monotonic()
+        with self._lock:
+            identities = [entry for entry in self._entries.pop(key, ()) if entry[0] != user_id]
+            self._entries[key] = [(user_id, now + self.ttl)] + identities[:self.recent_size - 1]
+            self._expire(now)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)  # least recently matched camera
+            self._update_size()
+
+    def discard(self, key, user_id):
+        with self._lock:
+            identities = [entry for entry in self._entries.get(key, ()) if entry[0] != user_id]
+            if identities:
+                self._entries[key] = identities
+            else:
+                self._entries.pop(key, None)
+            self._update_size()
+
+
+_cache = None
+
+
+def get_match_cache(config):
+    global _cache
+    if _cache is None:
+        _cache = MatchCache(config['FACE_MATCH_CACHE_SIZE'], config['FACE_MATCH_CACHE_TTL'],
+                            config['FACE_MATCH_CACHE_RECENT'])
+    return _cache
+
+
+def cached_match_steps(organization_id, camera_id, probe, config):
+    """cached_match as query steps (see face_encodings.matching.run_steps)."""
+    probe = np.asarray(probe, dtype=np.float64)
+    if not config['FACE_MATCH_CACHE'] or not camera_id:
+        # Requests without a camera_id do not come from one video stream, so they share no recent faces
+        return (yield from match_embedding_steps(organization_id, probe, config))
+
+    cache = get_match_cache(config)
+    key = (organization_id, camera_id)
+
+    recent = cache.recent(key)
+    if recent:
+        # One query verifies the probe against all of the camera's recent students
+        distances = yield from identity_distances(recent, probe, config['FACE_PROTOTYPES'])
+        for user_id in recent:
+            if user_id not in distances:
+                cache.discard(key, user_id)  # the student or their encodings are gone
+        if distances:
+            user_id = min(distances, key=distances.get)
+            # Only a frame much closer than FACE_MATCH_TOLERANCE is taken as the same face: a lookalike
+            # within tolerance of a recent student may still be nearer to someone else in the gallery
+            if distances[user_id] <= config['FACE_MATCH_CACHE_VERIFY_DISTANCE']:
+                FACE_MATCH_CACHE_REQUESTS.labels("hit").inc()
+                cache.put(key, user_id)
+                return user_id, distances[user_id]
+        # Someone the camera has not seen recently
+        FACE_MATCH_CACHE_REQUESTS.labels("rejected").inc()
+    else:
+        FACE_MATCH_CACHE_REQUESTS.labels("miss").inc()
+
+    user_id, distance = yield from match_embedding_steps(organization_id, probe, config)
+    if user_id:
+        cache.put(key, user_id)
+    return user_id, distance
+
+
+def cached_match(session, organization_id, camera_id, probe, config):
+    """match_embedding, trying the camera's recent identities before the full gallery search."""
+    return run_steps(session, cached_match_steps(organization_id, camera_id, probe, config))
@@ -0,0 +1,154 @@
+import numpy as np
+from sqlalchemy import select
+
+from models import FaceEncoding, FacePrototype, UserAccount, decode_embedding
+
+
+def parse_embedding(values, size=128):
+    """A client-supplied embedding as a float64 vector, or None unless it is `size` finite numbers."""
+    if not isinstance(values, list) or len(values) != size or any(isinstance(v, (str, bool)) for v in values):
+        return None
+    try:
+        embedding = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    return embedding if embedding.ndim == 1 and np.isfinite(embedding).all() else None
+
+
+def face_distance(gallery, probe):
+    """Euclidean distance from the probe to every row of the gallery (as face_recognition does)."""
+    if len(gallery) == 0:
+        return np.empty(0)
+    return np.linalg.norm(gallery - probe, axis=1)
+
+
+# The searches below are generators that yield each query they need and receive its rows.
+# The same code then runs on a Session (run_steps) or an AsyncSession, where the ASGI
+# ingest service awaits the queries and runs the numpy work in between in a worker thread.
+
+def advance(steps, rows=None):
+    """Send rows to a search and return (next query, False), or (result, True) once it is done."""
+    try:
+        return steps.send(rows), False
+    except StopIteration as stop:
+        return stop.value, True
+
+
+def run_steps(session, steps):
+    value, done = advance(steps)
+    while not done:
+        value, done = advance(steps, session.execute(value).all())
+    return value
+
+
+def _vectors(rows):
+    return np.array([decode_embedding(row[1]) for row in rows])
+
+
+def _best_per_user(user_ids, distances):
+    best = {}
+    for user_id, distance in zip(user_ids, distances):
+        if distance < best.get(user_id, np.inf):
+            best[user_id] = float(distance)
+    return best
+
+
+def encodings_query(organization_id, user_ids=None):
+    query = select(FaceEncoding.user_id, FaceEncoding.face_encoding).join(
+        UserAccount, FaceEncoding.user_id == UserAccount.id
+    ).where(UserAccount.organization_id == organization_id)
+    if user_ids is not None:
+        query = query.where(FaceEncoding.user_id.in_(user_ids))
+    return query
+
+
+def match_raw(organization_id, probe, tolerance, user_ids=None):
+    """Full search over the raw encodings (optionally only those of user_ids)."""
+    rows = yield encodings_query(organization_id, user_ids)
+    best = _best_per_user([row.user_id for row in rows], face_distance(_vectors(rows), probe))
+    if not best:
+        return None, None
+    user_id = min(best, key=best.get)
+    return (user_id, best[user_id]) if best[user_id] <= tolerance else (None, best[user_id])
+
+
+def match_prototypes(organization_id, probe, tolerance, margin, candidates):
+    """Search one centroid per student; fall back to raw encodings only for close calls."""
+    rows = yield select(FacePrototype.user_id, FacePrototype.prototype).join(
+        UserAccount, FacePrototype.user_id == UserAccount.id
+    ).where(UserAccount.organization_id == organization_id)
+    if not rows:
+        return None, None
+
+    distances = face_distance(_vectors(rows), probe)
+    order = np.argsort(distances)
+    best = float(distances[order[0]])
+    runner_up = float(distances[order[1]]) if len(order) > 1 else np.inf
+
+    # Clear decisions never touch the raw encodings
+    if best > tolerance + margin:
+        return None, best
+    if best < tolerance - margin and runner_up - best > margin:
+        return rows[order[0]].user_id, best
+
+    close_calls = [rows[i].user_id for i in order[:candidates] if distances[i] <= tolerance + margin]
+    return (yield from match_raw(organization_id, probe, tolerance, close_calls))
+
+
+def identity_distances(user_ids, probe, prototypes=False):
+    """{user_id: distance from the probe to that student's closest vector}, for students with vectors."""
+    model = FacePrototype if prototypes else FaceEncoding
+    column = FacePrototype.prototype if prototypes else FaceEncoding.face_encoding
+    rows = yield select(model.user_id, column).where(model.user_id.in_(user_ids))
+    return _best_per_user([row.user_id for row in rows], face_distance(_vectors(rows), probe))
+
+
+def match_embedding_steps(organization_id, probe, config):
+    probe = np.asarray(probe, dtype=np.float64)
+    if config['FACE_PROTOTYPES']:
+        return (yield from match_prototypes(organization_id, probe, config['FACE_MATCH_TOLERANCE'],
+                                            config['FACE_PROTOTYPE_MARGIN'], config['FACE_PROTOTYPE_CANDIDATES']))
+    return (yield from match_raw(organization_id, probe, config['FACE_MATCH_TOLERANCE']))
+
+
+def match_embedding(session, organization_id, probe, config):
+    """Return (user_id, distance) of the closest student within tolerance, or (None, distance)."""
+    return run_steps(session, match_embedding_steps(organization_id, probe, config))
+
+
+def update_prototype(session, user_id, encoding, prototype=None):
+    """Fold a new encoding into the user's centroid: c' = (n * c + x) / (n + 1)."""
+    if prototype is None:
+        session.add(FacePrototype(user_id=user_id, prototype=encoding.tobytes(), encoding_count=1))
+        return
+
+    count = prototype.encoding_count
+    centroid = (prototype.embedding * count + encoding) / (count + 1)
+    prototype.prototype = centroid.tobytes()
+    prototype.encoding_count = count + 1
+
+
+def rebuild_prototypes(session, organization_id=None):
+    """Recompute every centroid from the raw encodings, e.g. after enabling FACE_PROTOTYPES."""
+    query = select(FaceEncoding.user_id, FaceEncoding.face_encoding)
+    if organization_id:
+        query = query.join(UserAccount, FaceEncoding.user_id == UserAccount.id).where(
+            UserAccount.organization_id == organization_id
+        )
+
+    encodings = {}
+    for row in session.execute(query):
+        encodings.setdefault(row.user_id, []).append(decode_embedding(row.face_encoding))
+
+    existing = {p.user_id: p for p in session.scalars(
+        select(FacePrototype).where(FacePrototype.user_id.in_(list(encodings)))
+    )}
+    for user_id, vectors in encodings.items():
+        centroid = np.mean(vectors, axis=0)
+        prototype = existing.get(user_id)
+        if prototype:
+            prototype.prototype = centroid.tobytes()
+            prototype.encoding_count = len(vectors)
+        else:
+            session.add(FacePrototype(user_id=user_id, prototype=centroid.tobytes(), encoding_count=len(vectors)))
+    return len(encodings)
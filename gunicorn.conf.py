@@ -0,0 +1,21 @@
+# PROMETHEUS_MULTIPROC_DIR=/tmp/tirek-metrics gunicorn -c gunicorn.conf.py
+# (the directory must exist and be emptied before each start so /metrics aggregates all workers)
+import os
+
+wsgi_app = "app:create_app()"
+
+# Import the app once in the master; workers fork from it and start instantly
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Connections must never be shared across processes: give the worker fresh pools
+    from models import dispose_engines
+    dispose_engines(close=False)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges from the multiprocess metrics directory
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
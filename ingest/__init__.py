@@ -0,0 +1 @@
+from .ingest import create_ingest_app
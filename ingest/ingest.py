@@ -0,0 +1,198 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from uuid import uuid4
+
+from prometheus_client import CONTENT_TYPE_LATEST
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from auth import bearer_token, decode_token
+from config import Config
+from metrics import EVENTS_INGESTED, FACE_MATCHES, render_metrics
+from models import (Event, EventType, UserAccount, UserRole, TenantMoving, cached_shard_for_organization,
+                    shard_for_organization)
+from models.database import configure_database, shard_spec
+
+# Async drivers for the sync URLs in DATABASE_URL / SHARDS
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+class AsyncDatabase:
+    """Lazily created async engine and session factory per shard."""
+
+    def __init__(self, pool_size):
+        self.pool_size = pool_size
+        self._session_factories = {}
+
+    def session(self, shard_name):
+        factory = self._session_factories.get(shard_name)
+        if factory is None:
+            spec = shard_spec(shard_name)
+            options = {}
+            if spec.get("schema"):
+                options["execution_options"] = {"schema_translate_map": {None: spec["schema"]}}
+            if make_url(spec["url"]).get_backend_name() == "postgresql":
+                options.update(pool_size=self.pool_size, max_overflow=self.pool_size)
+            engine = create_async_engine(async_url(spec["url"]), pool_pre_ping=True, **options)
+            factory = self._session_factories[shard_name] = async_sessionmaker(engine, expire_on_commit=False)
+        return factory()
+
+    async def dispose(self):
+        for factory in self._session_factories.values():
+            await factory.kw["bind"].dispose()
+        self._session_factories.clear()
+
+
+async def authenticate(request, database):
+    """Same JWT as the Flask API; returns (current_user, session, None) or (None, None, error response)."""
+    token = bearer_token(request.headers.get('Authorization'))
+    if not token:
+        return None, None, JSONResponse({"message": "Token is missing!"}, status_code=403)
+
+    session = None
+    try:
+        data = decode_token(token, request.app.state.config['SECRET_KEY'])
+        # A routing cache miss queries the sync directory, so keep it off the event loop
+        shard_name = (cached_shard_for_organization(data.get('organization_id'))
+                      or await asyncio.to_thread(shard_for_organization, data.get('organization_id')))
+        session = database.session(shard_name)
+        current_user = await session.get(UserAccount, data['user_id'])
+    except TenantMoving as e:
+        return None, None, JSONResponse({"message": str(e)}, status_code=503,
+                                        headers={"Retry-After": str(request.app.state.config['SHARD_ROUTING_TTL'])})
+    except Exception as e:
+        if session:
+            await session.close()
+        return None, None, JSONResponse({"message": f"Token is invalid! {str(e)}"}, status_code=403)
+
+    if not current_user or current_user.user_role != UserRole.ADMIN:
+        await session.close()
+        return None, None, JSONResponse({"message": "Permission denied!"}, status_code=403)
+    return current_user, session, None
+
+
+async def add_event(request):
+    current_user, session, error = await authenticate(request, request.app.state.database)
+    if error:
+        return error
+
+    try:
+        data = await request.json()
+        if not isinstance(data, dict) or not data.get('student_id'):
+            return JSONResponse({"message": "Student ID is required"}, status_code=400)
+
+        student = await session.get(UserAccount, data['student_id'])
+        if not student or student.organization_id != current_user.organization_id:
+            return JSONResponse({"message": "Student not found or not in this organization"}, status_code=404)
+
+        event_type = EventType.parse(data.get('event_type'))
+        if not event_type:
+            return JSONResponse({"message": "Invalid event type"}, status_code=400)
+
+        try:
+            timestamp = datetime.fromisoformat(data['timestamp']) if data.get('timestamp') else datetime.utcnow()
+        except (TypeError, ValueError):
+            return JSONResponse({"message": "Invalid timestamp"}, status_code=400)
+
+        new_event = Event(
+            id=str(uuid4()),
+            organization_id=current_user.organization_id,
+            student_id=student.id,
+            event_type=event_type,
+            timestamp=timestamp,
+            camera_id=data.get('camera_id')
+        )
+        session.add(new_event)
+        await session.commit()
+        EVENTS_INGESTED.labels(event_type.name).inc()
+        return JSONResponse({"message": "Event added", "event_id": new_event.id}, status_code=201)
+
+    except ValueError:
+        return JSONResponse({"message": "Invalid JSON body"}, status_code=400)
+    except Exception as e:
+        await session.rollback()
+        logging.error(f"Error adding event: {str(e)}")
+        return JSONResponse({"error": "Database error occurred"}, status_code=500)
+    finally:
+        await session.close()
+
+
+async def run_steps_async(session, steps):
+    """face_encodings.matching.run_steps on an AsyncSession: the queries are awaited and the
+    numpy work between them runs in a worker thread, so other cameras are not held up."""
+    from face_encodings.matching import advance
+    value, done = await asyncio.to_thread(advance, steps)
+    while not done:
+        rows = (await session.execute(value)).all()
+        value, done = await asyncio.to_thread(advance, steps, rows)
+    return value
+
+
+async def match_face(request):
+    current_user, session, error = await authenticate(request, request.app.state.database)
+    if error:
+        return error
+
+    try:
+        data = await request.json()
+        from face_encodings.matching import parse_embedding
+        from face_encodings.match_cache import cached_match_steps
+        embedding = parse_embedding(data.get('embedding') if isinstance(data, dict) else None)
+        if embedding is None:
+            return JSONResponse({"error": "Provide a 128-value embedding"}, status_code=400)
+
+        steps = cached_match_steps(current_user.organization_id, data.get('camera_id'), embedding,
+                                   request.app.state.config)
+        user_id, distance = await run_steps_async(session, steps)
+        FACE_MATCHES.labels("match" if user_id else "no_match").inc()
+        if not user_id:
+            return JSONResponse({"match": False, "distance": distance})
+
+        user = await session.get(UserAccount, user_id)
+        return JSONResponse({"match": True, "user_id": user_id, "user_name": user.user_name, "distance": distance})
+
+    except ValueError:
+        return JSONResponse({"message": "Invalid JSON body"}, status_code=400)
+    except Exception as e:
+        logging.error(f"Error matching face: {str(e)}")
+        return JSONResponse({"error": "Database error occurred"}, status_code=500)
+    finally:
+        await session.close()
+
+
+async def metrics(request):
+    # Under several uvicorn workers, or to merge with gunicorn, share PROMETHEUS_MULTIPROC_DIR
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+def create_ingest_app(config=Config):
+    """ASGI app for the camera write paths: uvicorn --factory ingest:create_ingest_app"""
+    configure_database(config)
+    database = AsyncDatabase(config.INGEST_DB_POOL_SIZE)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await database.dispose()
+
+    app = Starlette(
+        routes=[
+            Route('/events', add_event, methods=['POST']),
+            Route('/face_encodings/match', match_face, methods=['POST']),
+            Route('/metrics', metrics, methods=['GET']),
+        ],
+        lifespan=lifespan,
+    )
+    app.state.config = {key: getattr(config, key) for key in dir(config) if key.isupper()}
+    app.state.database = database
+    return app
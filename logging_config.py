@@ -1,14 +1,34 @@
 import logging
-from app import app 
-from flask import request, jsonify
-
-# Настройка логирования
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                    handlers=[logging.FileHandler("app.log"), logging.StreamHandler()])
+from flask import request
 
 logger = logging.getLogger(__name__)
 
-@app.before_request
-def log_request_info():
-    logger.info(f"Request: {request.method} {request.url}")
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Handlers added by init_logging, replaced when another app is created in the same process
+_handlers = []
+
+
+def init_logging(app):
+    # Настройка логирования: LOG_LEVEL for the root logger, stderr plus LOG_FILE if set
+    root = logging.getLogger()
+    for handler in _handlers:
+        root.removeHandler(handler)
+        handler.close()
+    _handlers.clear()
+
+    # Leave stderr alone if the host process (e.g. a CLI script) configured it already
+    if not root.handlers:
+        _handlers.append(logging.StreamHandler())
+    if app.config.get("LOG_FILE"):
+        _handlers.append(logging.FileHandler(app.config["LOG_FILE"]))
+    for handler in _handlers:
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+    root.setLevel(app.config.get("LOG_LEVEL", "INFO"))
+
+    # Request counts and latency come from /metrics; the per-request line is for debugging only
+    if logger.isEnabledFor(logging.DEBUG):
+        @app.before_request
+        def log_request_info():
+            logger.debug(f"Request: {request.method} {request.url}")
@@ -0,0 +1,2 @@
+from .metrics import (metrics_bp, init_metrics, render_metrics, EVENTS_INGESTED, FACE_ENCODINGS_ADDED,
+                      FACE_ENCODINGS_REJECTED, FACE_MATCHES, FACE_MATCH_CACHE_REQUESTS, FACE_MATCH_CACHE_SIZE)
@@ -0,0 +1,107 @@
+import os
+import time
+
+from flask import Blueprint, Response, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY,
+                               generate_latest, multiprocess)
+from sqlalchemy import event
+from models import on_engine_created
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Values are aggregated in process memory. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR
+# and every worker writes to its own memory-mapped file in that directory; /metrics
+# then merges all workers.
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "HTTP requests", ["blueprint", "route", "method", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["blueprint", "route", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size", ["blueprint", "route"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being handled", ["blueprint"], multiprocess_mode="livesum"
+)
+
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured connection pool size", ["shard"], multiprocess_mode="livesum")
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool", ["shard"], multiprocess_mode="livesum"
+)
+DB_CONNECTIONS_OPENED = Counter("db_connections_opened_total", "New DBAPI connections opened", ["shard"])
+
+EVENTS_INGESTED = Counter("events_ingested_total", "Events stored", ["event_type"])
+FACE_ENCODINGS_ADDED = Counter("face_encodings_added_total", "Face encodings stored")
+FACE_ENCODINGS_REJECTED = Counter("face_encodings_rejected_total", "Enrolment images rejected as outliers")
+FACE_MATCHES = Counter("face_matches_total", "Face match requests", ["result"])
+FACE_MATCH_CACHE_REQUESTS = Counter(
+    "face_match_cache_requests_total",
+    "Recent-match cache lookups (hit; miss: no recent identities; rejected: none of them matched)", ["result"]
+)
+FACE_MATCH_CACHE_SIZE = Gauge("face_match_cache_entries", "Cameras in the recent-match cache", multiprocess_mode="livesum")
+
+
+def _instrument_pool(shard_name, shard_engine):
+    pool = shard_engine.pool
+    if hasattr(pool, "size"):
+        DB_POOL_SIZE.labels(shard_name).set(pool.size())
+
+    event.listen(pool, "connect", lambda *args: DB_CONNECTIONS_OPENED.labels(shard_name).inc())
+    event.listen(pool, "checkout", lambda *args: DB_POOL_CHECKED_OUT.labels(shard_name).inc())
+    event.listen(pool, "checkin", lambda *args: DB_POOL_CHECKED_OUT.labels(shard_name).dec())
+
+
+on_engine_created(_instrument_pool)
+
+
+def _labels():
+    return request.blueprint or "", request.url_rule.rule if request.url_rule else "<unmatched>"
+
+
+def init_metrics(app):
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_blueprint = request.blueprint or ""
+        REQUESTS_IN_PROGRESS.labels(g.metrics_blueprint).inc()
+
+    def record(status, size):
+        g.metrics_recorded = True
+        blueprint, route = _labels()
+        REQUEST_LATENCY.labels(blueprint, route, request.method).observe(time.perf_counter() - g.metrics_start)
+        REQUEST_COUNT.labels(blueprint, route, request.method, status).inc()
+        RESPONSE_SIZE.labels(blueprint, route).observe(size)
+
+    @app.after_request
+    def record_request(response):
+        if "metrics_start" in g:
+            record(response.status_code, response.content_length or 0)
+        return response
+
+    @app.teardown_request
+    def finish_request(exc):
+        # Runs even when the view raised, so errors are counted and the in-progress gauge never leaks
+        if "metrics_start" not in g:
+            return
+        if not g.get("metrics_recorded"):
+            record(500, 0)
+        REQUESTS_IN_PROGRESS.labels(g.metrics_blueprint).dec()
+
+
+def render_metrics():
+    """Exposition text for this process, or for every process sharing PROMETHEUS_MULTIPROC_DIR."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype=CONTENT_TYPE_LATEST)
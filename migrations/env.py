@@ -1,15 +1,65 @@
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+from config import Config
 from models import Base  # Добавляем ваши модели
 
+config = context.config
+
+
+def shard_options():
+    """Target a tenant shard with `alembic -x shard=<name> upgrade head`."""
+    shard_name = context.get_x_argument(as_dictionary=True).get("shard")
+    if shard_name and shard_name != "default":
+        spec = Config.SHARDS[shard_name]
+        return spec if isinstance(spec, dict) else {"url": spec}
+    if Config.SQLALCHEMY_DATABASE_URI:
+        return {"url": Config.SQLALCHEMY_DATABASE_URI}
+    return {}
+
+
+def run_migrations_offline():
+    options = shard_options()
+    context.configure(
+        url=options.get("url", config.get_main_option("sqlalchemy.url")),
+        target_metadata=Base.metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
 def run_migrations_online():
-    ...
+    options = shard_options()
+    section = config.get_section(config.config_ini_section)
+    if "url" in options:
+        section["sqlalchemy.url"] = options["url"]
+
     connectable = engine_from_config(
-        config.get_section(config.config_ini_section),
+        section,
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
 
     with connectable.connect() as connection:
+        # Schema-based shards keep their own tables and version table
+        schema = options.get("schema")
+        if schema:
+            connection = connection.execution_options(schema_translate_map={None: schema})
+
         context.configure(
             connection=connection,
-            target_metadata=Base.metadata  # Указываем метаданные моделей
+            target_metadata=Base.metadata,  # Указываем метаданные моделей
+            version_table_schema=schema,
         )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,89 @@
+"""Partition the event table by month on timestamp
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+Postgres only. A partitioned table cannot have a primary key that excludes the
+partition column and event.timestamp is nullable, so the new table keeps id as
+an indexed column instead of the primary key. Rows without a timestamp land in
+the event_default partition.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from models.partitioning import (add_months, month_start, qualified, create_event_partition,
+                                 ensure_event_partitions)
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+EVENT_COLUMNS = "id, event_type, organization_id, timestamp, student_id, camera_id"
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql":
+        return
+
+    event = qualified(connection, "event")
+    legacy = qualified(connection, "event_unpartitioned")
+
+    op.execute(f"ALTER TABLE {event} RENAME TO event_unpartitioned")
+    op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT event_pkey TO event_unpartitioned_pkey")
+    op.execute(f"""
+        CREATE TABLE {event} (
+            id VARCHAR NOT NULL,
+            event_type {qualified(connection, "eventtype")} NOT NULL,
+            organization_id VARCHAR REFERENCES {qualified(connection, "organization")} (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE,
+            student_id VARCHAR REFERENCES {qualified(connection, "account")} (id),
+            camera_id VARCHAR
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute(f"CREATE INDEX ix_event_id ON {event} (id)")
+    op.execute(f"CREATE INDEX ix_event_organization_id_timestamp ON {event} (organization_id, timestamp)")
+    op.execute(f"CREATE TABLE {qualified(connection, 'event_default')} PARTITION OF {event} DEFAULT")
+
+    # One partition per month that already has data, then the upcoming months
+    first = connection.execute(sa.text(f"SELECT MIN(timestamp) FROM {legacy}")).scalar()
+    month = month_start(first or datetime.utcnow())
+    current = month_start(datetime.utcnow())
+    while month < current:
+        create_event_partition(connection, month)
+        month = add_months(month, 1)
+    ensure_event_partitions(connection)
+
+    op.execute(f"INSERT INTO {event} ({EVENT_COLUMNS}) SELECT {EVENT_COLUMNS} FROM {legacy}")
+    op.execute(f"DROP TABLE {legacy}")
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != "postgresql":
+        return
+
+    event = qualified(connection, "event")
+    legacy = qualified(connection, "event_unpartitioned")
+
+    op.execute(f"""
+        CREATE TABLE {legacy} (
+            id VARCHAR NOT NULL CONSTRAINT event_unpartitioned_pkey PRIMARY KEY,
+            event_type {qualified(connection, "eventtype")} NOT NULL,
+            organization_id VARCHAR REFERENCES {qualified(connection, "organization")} (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE,
+            student_id VARCHAR REFERENCES {qualified(connection, "account")} (id),
+            camera_id VARCHAR
+        )
+    """)
+    op.execute(f"INSERT INTO {legacy} ({EVENT_COLUMNS}) SELECT {EVENT_COLUMNS} FROM {event}")
+    op.execute(f"DROP TABLE {event}")  # drops the partitions as well
+    op.execute(f"ALTER TABLE {legacy} RENAME TO event")
+    op.execute(f"ALTER TABLE {qualified(connection, 'event')} RENAME CONSTRAINT event_unpartitioned_pkey TO event_pkey")
@@ -1,5 +1,6 @@
-from .models import Base, UserAccount, Event, Schedule, EventType, UserRole,Organization, FaceEncoding, Subscription  # Импорт моделей
-from .models import engine, SessionLocal  # Импорт движка и сессии
-
-# Создаем сессию для работы с БД
-session = SessionLocal()
\ No newline at end of file
+from .models import Base, UserAccount, Event, Schedule, EventType, UserRole,Organization, FaceEncoding, FacePrototype, Subscription, TenantShard, AccountLogin, decode_embedding  # Импорт моделей
+from .database import (DEFAULT_SHARD, SessionLocal, configure_database, dispose_engines, get_engine,  # Движки создаются лениво
+                       get_shard_engine, get_shard_session, init_db, on_engine_created, shard_names)
+from .sharding import (cached_shard_for_organization, shard_for_organization, session_for_organization,
+                       set_shard_for_organization, freeze_organization, moving_from, TenantMoving,
+                       organization_for_login, claim_logins, release_logins)
@@ -0,0 +1,120 @@
+import os
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from config import Config
+from .models import Base
+
+DEFAULT_SHARD = "default"
+
+# Nothing connects at import time: engines are created on first use, per shard,
+# from the configuration passed to create_app (Config by default).
+_config = Config
+_engines = {}
+_session_factories = {}
+_lock = threading.Lock()
+_engine_hooks = []
+
+
+def get_config():
+    return _config
+
+
+def configure_database(config):
+    """Switch to another configuration, dropping engines built from the previous one."""
+    global _config
+    dispose_engines()
+    _config = config
+
+
+def on_engine_created(hook):
+    """Call hook(shard_name, engine) for every engine, including ones that already exist."""
+    _engine_hooks.append(hook)
+    for shard_name, shard_engine in list(_engines.items()):
+        hook(shard_name, shard_engine)
+
+
+def shard_names():
+    return [DEFAULT_SHARD, *_config.SHARDS]
+
+
+def shard_spec(shard_name):
+    if shard_name == DEFAULT_SHARD:
+        return {"url": _config.SQLALCHEMY_DATABASE_URI}
+
+    spec = _config.SHARDS.get(shard_name)
+    if spec is None:
+        raise KeyError(f"Unknown shard: {shard_name}")
+    return spec if isinstance(spec, dict) else {"url": spec}
+
+
+def get_shard_engine(shard_name=DEFAULT_SHARD):
+    shard_engine = _engines.get(shard_name)
+    if shard_engine is not None:
+        return shard_engine
+
+    with _lock:
+        if shard_name in _engines:
+            return _engines[shard_name]
+
+        spec = shard_spec(shard_name)
+        if not spec.get("url"):
+            raise RuntimeError(f"No database URL configured for shard {shard_name}")
+
+        options = {}
+        # Schema-based shards share a database but keep their own copy of every table
+        if spec.get("schema"):
+            options["execution_options"] = {"schema_translate_map": {None: spec["schema"]}}
+
+        shard_engine = create_engine(spec["url"], pool_pre_ping=True, **options)
+        _engines[shard_name] = shard_engine
+        _session_factories[shard_name] = sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+        for hook in _engine_hooks:
+            hook(shard_name, shard_engine)
+        return shard_engine
+
+
+def get_engine():
+    return get_shard_engine(DEFAULT_SHARD)
+
+
+def get_shard_session(shard_name=DEFAULT_SHARD):
+    get_shard_engine(shard_name)
+    return _session_factories[shard_name]()
+
+
+# Session factory for the default shard, for standalone scripts and the tenant directory
+def SessionLocal():
+    return get_shard_session(DEFAULT_SHARD)
+
+
+def init_db():
+    """Create missing tables on every shard. Run once per deployment, before the migrations."""
+    for shard_name in shard_names():
+        Base.metadata.create_all(get_shard_engine(shard_name))
+
+
+def dispose_engines(close=True):
+    """Drop pooled connections.
+
+    After a fork, call with close=False: the child gets fresh pools without closing
+    the sockets the parent process is still using.
+    """
+    with _lock:
+        for shard_engine in _engines.values():
+            shard_engine.dispose(close=close)
+        if close:
+            _engines.clear()
+            _session_factories.clear()
+
+
+def _after_fork_in_child():
+    global _lock
+    _lock = threading.Lock()  # the parent may have held it while forking
+    dispose_engines(close=False)
+
+
+# Covers any forking server (gunicorn --preload, multiprocessing), not only gunicorn's post_fork hook
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -1,21 +1,22 @@
 from datetime import datetime
 from enum import Enum
+from typing import TYPE_CHECKING
 from uuid import uuid4
 
-import numpy as np
-from sqlalchemy import create_engine, Column, String, DateTime, ForeignKey, Enum as DbEnum, LargeBinary, Integer
+from sqlalchemy import Column, String, DateTime, ForeignKey, Enum as DbEnum, LargeBinary, Integer
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import func
-from config import Config
 
-# Create engine and Base for standalone use
-engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
-Base = declarative_base()
+if TYPE_CHECKING:
+    import numpy as np  # annotations only; numpy is imported on first use
 
+# Engines and sessions are created lazily in models/database.py
+Base = declarative_base()
 
-# Session factory for standalone scripts (outside of Flask)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Face vectors are stored as raw float64 bytes (face_encoding.face_encoding, face_prototype.prototype)
+def decode_embedding(data) -> "np.ndarray":
+    import numpy as np  # imported on first use to keep startup fast
+    return np.frombuffer(data, dtype=np.float64)
 
 # Helper function for UUID primary keys
 def string_uuid() -> str:
@@ -30,6 +31,11 @@ class EventType(str, Enum):
     WEAPON = "WEAPON"
     LYING_MAN = "LYING_MAN"
 
+    @classmethod
+    def parse(cls, value):
+        """Case-insensitive lookup by name; None for unknown values."""
+        return cls.__members__.get(str(value or "").upper())
+
 class UserRole(str, Enum):
     STUDENT = "STUDENT"
     PARENT = "PARENT"
@@ -48,6 +54,21 @@ class Organization(Base):
     org_name = Column(String, unique=True, nullable=False)
 
 
+# Tenant routing table: maps an organization to the shard holding its data.
+# Lives on the default shard; organizations without a row use the default shard.
+class TenantShard(Base):
+    __tablename__ = "tenant_shard"
+    organization_id = Column(String, ForeignKey("organization.id"), primary_key=True)
+    shard_name = Column(String, nullable=False)
+
+
+# Login directory: keeps logins unique across shards and routes /login to the account's organization.
+# Lives on the default shard and is only maintained when tenant shards are configured.
+class AccountLogin(Base):
+    __tablename__ = "account_login"
+    user_login = Column(String, primary_key=True)
+    organization_id = Column(String, ForeignKey("organization.id"), nullable=False)
+
 # User Account Table
 class UserAccount(Base):
     __tablename__ = "account"
@@ -67,8 +88,21 @@ class FaceEncoding(Base):
     user_id = Column(String, ForeignKey("account.id"))
 
     @property
-    def embedding(self) -> np.ndarray:
-        return np.frombuffer(self.face_encoding, dtype=np.float64)
+    def embedding(self) -> "np.ndarray":
+        return decode_embedding(self.face_encoding)
+
+
+# Face Prototype Table: running centroid of a user's face encodings (optional prototype matching mode)
+class FacePrototype(Base):
+    __tablename__ = "face_prototype"
+    id = Column(String, primary_key=True, default=lambda: string_uuid())
+    user_id = Column(String, ForeignKey("account.id"), nullable=False, unique=True)
+    prototype = Column(LargeBinary, nullable=False)
+    encoding_count = Column(Integer, nullable=False, default=0)
+
+    @property
+    def embedding(self) -> "np.ndarray":
+        return decode_embedding(self.prototype)
 
 
 # Subscription Table
@@ -81,7 +115,7 @@ class Subscription(Base):
     student_id = Column(String, ForeignKey("account.id"), nullable=True, default=None)
 
 
-# Event Table
+# Event Table (range-partitioned by month on timestamp in Postgres, see migrations/versions)
 class Event(Base):
     __tablename__ = "event"
     id = Column(String, primary_key=True, default=lambda: string_uuid())
@@ -99,7 +133,3 @@ class Schedule(Base):
     organization_id = Column(String, ForeignKey("organization.id"))
     start_time = Column(DateTime, nullable=True, default=None)
     end_time = Column(DateTime, nullable=True, default=None)
-
-
-# Create all tables in the database
-Base.metadata.create_all(engine)
@@ -0,0 +1,136 @@
+import re
+from datetime import datetime
+
+from sqlalchemy import text
+from .database import get_config
+
+# Monthly partitions of the event table are named event_YYYY_MM
+PARTITION_NAME = re.compile(r"^event_(\d{4})_(\d{2})$")
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"event_{month:%Y_%m}"
+
+
+def is_postgres(connection):
+    return connection.dialect.name == "postgresql"
+
+
+def _schema(connection):
+    # Schema-based shards rely on schema_translate_map, which raw SQL does not see
+    return connection.get_execution_options().get("schema_translate_map", {}).get(None)
+
+
+def qualified(connection, name):
+    schema = _schema(connection)
+    return f'"{schema}"."{name}"' if schema else f'"{name}"'
+
+
+def is_partitioned(connection):
+    if not is_postgres(connection):
+        return False
+    return bool(connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relname = 'event' AND n.nspname = COALESCE(:schema, current_schema())"
+    ), {"schema": _schema(connection)}).first())
+
+
+def list_event_partitions(connection):
+    """Return {month: partition_name} for the monthly partitions attached to event."""
+    rows = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "JOIN pg_namespace n ON n.oid = p.relnamespace "
+        "WHERE p.relname = 'event' AND n.nspname = COALESCE(:schema, current_schema())"
+    ), {"schema": _schema(connection)}).scalars()
+
+    partitions = {}
+    for name in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[datetime(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def has_default_partition(connection):
+    return connection.execute(text("SELECT to_regclass(:name)"),
+                              {"name": qualified(connection, "event_default")}).scalar() is not None
+
+
+def stranded_months(connection):
+    """Months with rows in event_default, e.g. from cameras with a skewed clock."""
+    if not has_default_partition(connection):
+        return []
+    return connection.execute(text(
+        f"SELECT DISTINCT date_trunc('month', timestamp) FROM {qualified(connection, 'event_default')} "
+        f"WHERE timestamp IS NOT NULL"
+    )).scalars().all()
+
+
+def create_event_partition(connection, month):
+    """Create the partition for a month, moving that month's rows out of event_default.
+
+    Postgres refuses to create a partition while the default partition holds rows in its
+    range, so those rows go into a standalone table that is then attached.
+    """
+    month = month_start(month)
+    name, event = qualified(connection, partition_name(month)), qualified(connection, "event")
+    bounds = f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    in_range = "timestamp >= :start AND timestamp < :end"
+    params = {"start": month, "end": add_months(month, 1)}
+
+    stranded = False
+    if has_default_partition(connection):
+        default = qualified(connection, "event_default")
+        # Creating or attaching a partition locks the default partition anyway; lock it first
+        # so no row for this month can arrive between the move and the attach
+        connection.execute(text(f"LOCK TABLE {default} IN EXCLUSIVE MODE"))
+        stranded = connection.execute(text(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1"), params).first()
+
+    if not stranded:
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {event} {bounds}"))
+        return
+
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {event} INCLUDING DEFAULTS)"))
+    connection.execute(text(
+        f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+    ), params)
+    connection.execute(text(f"ALTER TABLE {event} ATTACH PARTITION {name} {bounds}"))
+
+
+def ensure_event_partitions(connection, months_ahead=None, now=None):
+    """Create partitions from the current month up to months_ahead months in the future,
+    plus partitions for any month whose rows ended up in event_default."""
+    if not is_partitioned(connection):
+        return []
+
+    if months_ahead is None:
+        months_ahead = get_config().EVENT_PARTITION_MONTHS_AHEAD
+    current = month_start(now or datetime.utcnow())
+    existing = list_event_partitions(connection)
+    months = {add_months(current, offset) for offset in range(months_ahead + 1)}
+    months.update(month_start(month) for month in stranded_months(connection))
+
+    created = []
+    for month in sorted(months):
+        if month not in existing:
+            create_event_partition(connection, month)
+            created.append(partition_name(month))
+    return created
+
+
+def drop_event_partition(connection, name):
+    connection.execute(text(f"ALTER TABLE {qualified(connection, 'event')} DETACH PARTITION {qualified(connection, name)}"))
+    connection.execute(text(f"DROP TABLE {qualified(connection, name)}"))
@@ -0,0 +1,161 @@
+import time
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from .models import AccountLogin, TenantShard
+from .database import DEFAULT_SHARD, SessionLocal, get_config, get_shard_session, shard_names
+
+# organization_id -> (shard_name, expires_at); refreshed every SHARD_ROUTING_TTL seconds
+_routes = {}
+
+# Route of an organization that is being moved to another shard (rebalance_shards.py): "moving:<source shard>"
+MOVING_PREFIX = "moving:"
+
+
+class TenantMoving(Exception):
+    """The organization is being moved to another shard and its requests are refused until the move ends."""
+
+
+def cached_shard_for_organization(organization_id):
+    """The shard if it is known without a database round trip, else None."""
+    # Single-database deployments never touch the routing table
+    if not get_config().SHARDS or organization_id is None:
+        return DEFAULT_SHARD
+
+    cached = _routes.get(organization_id)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    return None
+
+
+def shard_for_organization(organization_id, use_cache=True):
+    if not get_config().SHARDS or organization_id is None:
+        return DEFAULT_SHARD
+    if use_cache and cached_shard_for_organization(organization_id):
+        return cached_shard_for_organization(organization_id)
+
+    now = time.monotonic()
+    shard_name = _route(organization_id)
+    if shard_name.startswith(MOVING_PREFIX):
+        # Not cached, so requests resume as soon as the move ends
+        raise TenantMoving(f"Organization {organization_id} is being moved to another shard, retry shortly")
+
+    _routes[organization_id] = (shard_name, now + get_config().SHARD_ROUTING_TTL)
+    return shard_name
+
+
+def _route(organization_id):
+    session = SessionLocal()
+    try:
+        route = session.get(TenantShard, organization_id)
+        return route.shard_name if route else DEFAULT_SHARD
+    finally:
+        session.close()
+
+
+def session_for_organization(organization_id):
+    return get_shard_session(shard_for_organization(organization_id))
+
+
+def set_shard_for_organization(organization_id, shard_name):
+    if shard_name not in shard_names():
+        raise KeyError(f"Unknown shard: {shard_name}")
+    _set_route(organization_id, shard_name)
+
+
+def freeze_organization(organization_id, source_shard):
+    """Refuse the organization's requests until set_shard_for_organization routes it again.
+
+    Workers keep serving from their cached route for up to SHARD_ROUTING_TTL seconds.
+    """
+    _set_route(organization_id, MOVING_PREFIX + source_shard)
+
+
+def moving_from(organization_id):
+    """The source shard of an unfinished move, or None."""
+    if not get_config().SHARDS or organization_id is None:
+        return None
+    shard_name = _route(organization_id)
+    return shard_name[len(MOVING_PREFIX):] if shard_name.startswith(MOVING_PREFIX) else None
+
+
+def _set_route(organization_id, shard_name):
+    session = SessionLocal()
+    try:
+        route = session.get(TenantShard, organization_id)
+        if shard_name == DEFAULT_SHARD:
+            if route:
+                session.delete(route)
+        elif route:
+            route.shard_name = shard_name
+        else:
+            session.add(TenantShard(organization_id=organization_id, shard_name=shard_name))
+        session.commit()
+    finally:
+        session.close()
+
+    _routes.pop(organization_id, None)
+
+
+def organization_for_login(user_login):
+    """The organization owning a login, or None (single database, or an account older than the directory)."""
+    if not get_config().SHARDS or not user_login:
+        return None
+
+    session = SessionLocal()
+    try:
+        entry = session.get(AccountLogin, user_login)
+        return entry.organization_id if entry else None
+    finally:
+        session.close()
+
+
+def _taken_logins(session, logins):
+    taken = set()
+    for start in range(0, len(logins), 1000):
+        taken.update(session.scalars(select(AccountLogin.user_login).where(
+            AccountLogin.user_login.in_(logins[start:start + 1000]))))
+    return taken
+
+
+def claim_logins(logins, organization_id):
+    """Reserve logins for an organization in the directory before its accounts are created.
+
+    Returns the logins that are already taken; nothing is reserved unless all are free.
+    Release the claim with release_logins if creating the accounts fails.
+    """
+    logins = list(logins)
+    if not get_config().SHARDS or not logins:
+        return set()
+
+    session = SessionLocal()
+    try:
+        taken = _taken_logins(session, logins)
+        if taken:
+            return taken
+        session.execute(insert(AccountLogin), [{"user_login": login, "organization_id": organization_id}
+                                               for login in logins])
+        session.commit()
+        return set()
+    except IntegrityError:
+        # Another request claimed one of them in the meantime
+        session.rollback()
+        return _taken_logins(session, logins) or set(logins)
+    finally:
+        session.close()
+
+
+def release_logins(logins, organization_id):
+    logins = list(logins)
+    if not get_config().SHARDS or not logins:
+        return
+
+    session = SessionLocal()
+    try:
+        for start in range(0, len(logins), 1000):
+            session.execute(delete(AccountLogin).where(AccountLogin.user_login.in_(logins[start:start + 1000]),
+                                                       AccountLogin.organization_id == organization_id))
+        session.commit()
+    finally:
+        session.close()
@@ -0,0 +1,101 @@
+import heapq
+import logging
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfile:
+    """SQL statistics for one request."""
+
+    def __init__(self, top):
+        self.top = top
+        self.query_count = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.slowest = []  # min-heap of (seconds, statement), at most `top` entries
+
+    def record(self, statement, seconds):
+        self.query_count += 1
+        self.db_time += seconds
+        self.statements[statement] += 1
+        if len(self.slowest) < self.top:
+            heapq.heappush(self.slowest, (seconds, statement))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, statement))
+
+
+def redact(parameters):
+    """Keep the shape of bound parameters but never their values."""
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"<{len(parameters)} parameter sets>"  # executemany
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return parameters
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    if not has_request_context() or "sql_profile" not in g:
+        return
+
+    g.sql_profile.record(statement, elapsed)
+    if elapsed * 1000 >= g.sql_slow_query_ms:
+        logger.warning(f"Slow query ({elapsed * 1000:.1f} ms) on {request.method} {request.path}: "
+                       f"{statement} params={redact(parameters)}")
+
+
+def init_profiling(app):
+    """Opt-in (SQL_PROFILING=1): per-request query count, DB time, slow query log and N+1 detection."""
+    if not app.config.get("SQL_PROFILING"):
+        return
+
+    # Listening on the Engine class covers every shard, including engines created later
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    slow_query_ms = app.config["SQL_SLOW_QUERY_MS"]
+    n_plus_one_threshold = app.config["SQL_N_PLUS_ONE_THRESHOLD"]
+    server_timing = app.config["SQL_SERVER_TIMING"]
+    top = app.config["SQL_PROFILE_TOP"]
+
+    @app.before_request
+    def start_profile():
+        g.sql_profile = RequestProfile(top)
+        g.sql_slow_query_ms = slow_query_ms
+        g.sql_request_start = time.perf_counter()
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop("sql_profile", None)
+        if profile is None:
+            return response
+        total_ms = (time.perf_counter() - g.sql_request_start) * 1000
+        db_ms = profile.db_time * 1000
+
+        for statement, count in profile.statements.items():
+            if count >= n_plus_one_threshold:
+                logger.warning(f"Possible N+1 on {request.method} {request.path}: "
+                               f"statement executed {count} times: {statement}")
+
+        slowest = sorted(profile.slowest, reverse=True)
+        logger.info(f"{request.method} {request.path}: {profile.query_count} queries, "
+                    f"{db_ms:.1f} ms in DB of {total_ms:.1f} ms; slowest: "
+                    + "; ".join(f"{seconds * 1000:.1f} ms {statement[:200]}" for seconds, statement in slowest))
+
+        if server_timing:
+            response.headers.add("Server-Timing", f'db;dur={db_ms:.1f};desc="{profile.query_count} queries"')
+            response.headers.add("Server-Timing", f"app;dur={total_ms - db_ms:.1f}")
+        return response
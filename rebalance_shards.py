@@ -0,0 +1,214 @@
+"""Move an organization's data to another tenant shard, pausing only its own requests for a moment.
+
+    python rebalance_shards.py <organization_id> <target_shard> [--batch-size 1000] [--keep-source]
+
+1. Copy the organization's rows to the target shard in batches (source keeps serving).
+   Its logins are registered in the login directory so /login can find them on any shard.
+2. Freeze the organization's route and wait for every worker's routing cache to expire.
+   From then on its requests get 503 and neither shard is written to.
+3. Sync the target with the source: insert new rows, update changed ones and remove rows
+   deleted from the source since the copy. This compares every row of the organization,
+   so the freeze lasts SHARD_ROUTING_TTL plus one read of its data on both shards.
+4. Route the organization to the target shard, which ends the freeze.
+5. Delete the moved rows from the source shard in batches.
+
+Every step is idempotent, so an interrupted move can simply be re-run.
+"""
+import argparse
+import logging
+import time
+
+from sqlalchemy import select, insert, update, delete
+from models import (AccountLogin, Organization, UserAccount, FaceEncoding, FacePrototype, Subscription, Schedule,
+                    Event, SessionLocal, get_shard_session, shard_for_organization, set_shard_for_organization,
+                    freeze_organization, moving_from)
+from models.database import get_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def tenant_tables(organization_id):
+    """Tables owned by an organization, in foreign key order, with the filter selecting its rows."""
+    account_ids = select(UserAccount.id).where(UserAccount.organization_id == organization_id)
+    return [
+        (UserAccount, UserAccount.organization_id == organization_id),
+        (FaceEncoding, FaceEncoding.user_id.in_(account_ids)),
+        (FacePrototype, FacePrototype.user_id.in_(account_ids)),
+        (Subscription, Subscription.organization_id == organization_id),
+        (Schedule, Schedule.organization_id == organization_id),
+        (Event, Event.organization_id == organization_id),
+    ]
+
+
+def copy_organization(organization_id, source_shard, target_shard):
+    source = get_shard_session(source_shard)
+    target = get_shard_session(target_shard)
+    try:
+        organization = source.get(Organization, organization_id)
+        if not organization:
+            raise ValueError(f"Organization {organization_id} not found on shard {source_shard}")
+        target.merge(Organization(id=organization.id, org_name=organization.org_name))
+        target.commit()
+    finally:
+        source.close()
+        target.close()
+
+
+def register_logins(organization_id, shard_name):
+    """Add the organization's logins that predate the login directory to it."""
+    source = get_shard_session(shard_name)
+    directory = SessionLocal()
+    try:
+        logins = source.scalars(select(UserAccount.user_login).where(UserAccount.organization_id == organization_id)).all()
+        known = {entry.user_login: entry.organization_id for entry in directory.scalars(
+            select(AccountLogin).where(AccountLogin.user_login.in_(logins)))}
+        for login in logins:
+            if login not in known:
+                directory.add(AccountLogin(user_login=login, organization_id=organization_id))
+            elif known[login] != organization_id:
+                logger.warning(f"Login '{login}' is also used by organization {known[login]}")
+        directory.commit()
+    finally:
+        source.close()
+        directory.close()
+
+
+def copy_rows(model, criteria, source_shard, target_shard, batch_size, overwrite=False):
+    """Copy matching rows that the target does not have yet, keyset-paginated by id.
+
+    With overwrite, rows the target already has are also updated where they differ from the source.
+    """
+    table = model.__table__
+    copied = updated = 0
+    last_id = ""
+    source = get_shard_session(source_shard)
+    target = get_shard_session(target_shard)
+    try:
+        while True:
+            rows = source.execute(
+                select(table).where(criteria, table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+
+            ids = [row["id"] for row in rows]
+            columns = [table] if overwrite else [table.c.id]
+            existing = {row["id"]: row for row in target.execute(
+                select(*columns).where(table.c.id.in_(ids))).mappings()}
+            missing = [dict(row) for row in rows if row["id"] not in existing]
+            changed = [dict(row) for row in rows if overwrite and row["id"] in existing
+                       and dict(row) != dict(existing[row["id"]])]
+            if missing:
+                target.execute(insert(table), missing)
+            for row in changed:
+                target.execute(update(table).where(table.c.id == row["id"]).values(row))
+            if missing or changed:
+                target.commit()
+                copied += len(missing)
+                updated += len(changed)
+    finally:
+        source.close()
+        target.close()
+
+    logger.info(f"Copied {copied} and updated {updated} rows of {table.name} from {source_shard} to {target_shard}")
+    return copied + updated
+
+
+def delete_missing_rows(model, criteria, source_shard, target_shard, batch_size):
+    """Delete matching rows of the target that are no longer on the source, keyset-paginated by id."""
+    table = model.__table__
+    deleted = 0
+    last_id = ""
+    source = get_shard_session(source_shard)
+    target = get_shard_session(target_shard)
+    try:
+        while True:
+            ids = target.scalars(
+                select(table.c.id).where(criteria, table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            kept = set(source.scalars(select(table.c.id).where(criteria, table.c.id.in_(ids))))
+            gone = [id for id in ids if id not in kept]
+            if gone:
+                target.execute(delete(table).where(table.c.id.in_(gone)))
+                target.commit()
+                deleted += len(gone)
+    finally:
+        source.close()
+        target.close()
+
+    logger.info(f"Deleted {deleted} rows of {table.name} from {target_shard} that are gone from {source_shard}")
+    return deleted
+
+
+def delete_rows(model, criteria, shard_name, batch_size):
+    table = model.__table__
+    deleted = 0
+    session = get_shard_session(shard_name)
+    try:
+        while True:
+            ids = session.scalars(select(table.c.id).where(criteria).limit(batch_size)).all()
+            if not ids:
+                break
+            session.execute(delete(table).where(table.c.id.in_(ids)))
+            session.commit()
+            deleted += len(ids)
+    finally:
+        session.close()
+
+    logger.info(f"Deleted {deleted} rows of {table.name} from {shard_name}")
+    return deleted
+
+
+def rebalance(organization_id, target_shard, batch_size=1000, keep_source=False):
+    # An interrupted move left the organization frozen; its data is still authoritative on the source
+    source_shard = moving_from(organization_id) or shard_for_organization(organization_id, use_cache=False)
+    if source_shard == target_shard:
+        set_shard_for_organization(organization_id, target_shard)
+        logger.info(f"Organization {organization_id} is already on shard {target_shard}")
+        return
+
+    logger.info(f"Moving organization {organization_id} from {source_shard} to {target_shard}")
+    copy_organization(organization_id, source_shard, target_shard)
+    for model, criteria in tenant_tables(organization_id):
+        copy_rows(model, criteria, source_shard, target_shard, batch_size)
+    register_logins(organization_id, source_shard)
+
+    freeze_organization(organization_id, source_shard)
+    logger.info(f"Requests refused, waiting {get_config().SHARD_ROUTING_TTL}s for cached routes to expire")
+    time.sleep(get_config().SHARD_ROUTING_TTL)
+
+    # Nothing writes to either shard now: bring over what changed on the source since the copy.
+    # Updates go first, so rows still referencing deleted accounts (events, subscriptions) are cleared
+    # before the deletes run in reverse foreign key order.
+    for model, criteria in tenant_tables(organization_id):
+        copy_rows(model, criteria, source_shard, target_shard, batch_size, overwrite=True)
+    for model, criteria in reversed(tenant_tables(organization_id)):
+        delete_missing_rows(model, criteria, source_shard, target_shard, batch_size)
+    register_logins(organization_id, source_shard)
+
+    set_shard_for_organization(organization_id, target_shard)
+    logger.info(f"Routing switched to {target_shard}")
+
+    if not keep_source:
+        # The organization row itself stays behind: it is still referenced by the directory
+        for model, criteria in reversed(tenant_tables(organization_id)):
+            delete_rows(model, criteria, source_shard, batch_size)
+
+    logger.info(f"Organization {organization_id} now lives on shard {target_shard}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Move an organization to another tenant shard")
+    parser.add_argument("organization_id")
+    parser.add_argument("target_shard")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--keep-source", action="store_true", help="Do not delete rows from the source shard")
+    args = parser.parse_args()
+
+    rebalance(args.organization_id, args.target_shard, args.batch_size, args.keep_source)
@@ -1,12 +1,14 @@
 from flask import Blueprint, jsonify, request
-from models import Organization, SessionLocal
+from models import (Organization, SessionLocal, DEFAULT_SHARD, shard_names, get_shard_session,
+                    shard_for_organization, set_shard_for_organization)
 from auth.auth import token_required, role_required
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 
 schools_bp = Blueprint('schools', __name__)
 
-# Helper function for session management
+# Helper function for session management.
+# Organizations are the tenant directory and always live on the default shard.
 def get_session():
     return SessionLocal()
 
@@ -25,6 +27,10 @@ def add_school(current_user):
         if not data or 'org_name' not in data:
             return jsonify({"message": "Invalid input. 'org_name' is required."}), 400
 
+        shard_name = data.get('shard', DEFAULT_SHARD)
+        if shard_name not in shard_names():
+            return jsonify({"message": f"Unknown shard '{shard_name}'."}), 400
+
         # Check if a school with the same name already exists
         existing_school = session.query(Organization).filter_by(org_name=data['org_name']).first()
         if existing_school:
@@ -38,7 +44,17 @@ def add_school(current_user):
         session.add(new_school)
         session.commit()
 
-        return jsonify({"message": "School added", "school_id": new_school.id}), 201
+        # Place the school on its shard: copy the organization row there and route to it
+        if shard_name != DEFAULT_SHARD:
+            shard_session = get_shard_session(shard_name)
+            try:
+                shard_session.merge(Organization(id=new_school.id, org_name=new_school.org_name))
+                shard_session.commit()
+            finally:
+                shard_session.close()
+            set_shard_for_organization(new_school.id, shard_name)
+
+        return jsonify({"message": "School added", "school_id": new_school.id, "shard": shard_name}), 201
 
     except SQLAlchemyError as e:
         session.rollback()
@@ -79,8 +95,19 @@ def update_school(current_user, school_id):
     # Update the school's name
     school.org_name = data.get('org_name', school.org_name)
     session.commit()
+    org_name = school.org_name
     session.close()
 
+    # Keep the copy on the school's shard in sync
+    shard_name = shard_for_organization(school_id)
+    if shard_name != DEFAULT_SHARD:
+        shard_session = get_shard_session(shard_name)
+        try:
+            shard_session.merge(Organization(id=school_id, org_name=org_name))
+            shard_session.commit()
+        finally:
+            shard_session.close()
+
     return jsonify({"message": "School updated"}), 200
 
 
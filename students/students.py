@@ -1,34 +1,33 @@
-from flask import Blueprint, jsonify, request
-from models import UserAccount, UserRole, SessionLocal, engine, Organization, FaceEncoding, Subscription
+from flask import Blueprint, current_app, jsonify, request
+from models import (UserAccount, UserRole, Organization, FaceEncoding, FacePrototype, Subscription, Event,
+                    session_for_organization, claim_logins, release_logins)
 from auth.auth import token_required, role_required
-from sqlalchemy.orm import scoped_session, sessionmaker
+import csv
+import io
 import logging
 from uuid import uuid4
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.exc import SQLAlchemyError
 
 students_bp = Blueprint('students', __name__)
 
-SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
-
-def get_session():
-    return SessionLocal()
-
-# Настраиваем логирование
-logging.basicConfig(level=logging.INFO)
+# Resolve the session on the shard holding the organization's data
+def get_session(organization_id):
+    return session_for_organization(organization_id)
 
 @students_bp.route('/students', methods=['POST'])
 @token_required
 @role_required("ADMIN")
 def add_student(current_user):
-    session = get_session()  # Create a new session
     data = request.get_json()
 
     # Ensure organization_id exists in the database
     organization_id = data.get("organization_id", "").strip()  # Strip whitespace
     if not organization_id:
-        session.close()
         return jsonify({"message": "Organization ID is required"}), 400
 
+    session = get_session(organization_id)  # Create a new session
+
     organization = session.query(Organization).filter_by(id=organization_id).first()
     if not organization:
         session.close()
@@ -50,12 +49,18 @@ def add_student(current_user):
         password_hash="default_password"  # Placeholder for the password hash
     )
 
+    # Logins are unique across every shard, not just this one
+    if claim_logins([new_student.user_login], organization_id):
+        session.close()
+        return jsonify({"message": f"Login '{new_student.user_login}' already exists"}), 400
+
     try:
         session.add(new_student)
         session.commit()
         return jsonify({"message": "Student added successfully", "student_id": new_student.id, "student_name" : str(student_name)}), 201
     except SQLAlchemyError as e:
         session.rollback()
+        release_logins([new_student.user_login], organization_id)
         logging.error(f"Error adding student: {str(e)}")
         return jsonify({"error": "An error occurred while adding the student"}), 500
     finally:
@@ -67,7 +72,7 @@ def add_student(current_user):
 @token_required
 @role_required("STAFF","ADMIN","OWNER")
 def get_students(current_user):
-    session = get_session()
+    session = get_session(current_user.organization_id)
 
     logging.info(f"Fetching students for organization: {current_user.organization_id}")
 
@@ -88,7 +93,7 @@ def get_students(current_user):
 @token_required
 @role_required("STAFF","ADMIN","OWNER")
 def students_number(current_user):
-    session = get_session()
+    session = get_session(current_user.organization_id)
     try:
         logging.info(f"Counting students for organization: {current_user.organization_id}")
 
@@ -106,7 +111,7 @@ def students_number(current_user):
 @token_required
 @role_required("ADMIN")
 def delete_student(current_user, student_id):
-    session = get_session()
+    session = get_session(current_user.organization_id)
     try:
         logging.info(f"Attempting to delete student with ID: {student_id} by user: {current_user.id}")
 
@@ -121,13 +126,11 @@ def delete_student(current_user, student_id):
             logging.warning(f"Student with ID: {student_id} not found or unauthorized access attempted.")
             return jsonify({"message": "Student not found or access denied"}), 404
 
-        # Delete related records in dependent tables
-        session.query(FaceEncoding).filter_by(user_id=student_id).delete()
-        session.query(Subscription).filter_by(user_id=student_id).delete()
-
-        # Delete the student record
-        session.delete(student)
+        # Delete the student together with the records in dependent tables
+        logins = delete_students(session, current_user.organization_id, [student_id],
+                                 request.args.get('delete_events', '').lower() in ('1', 'true'))
         session.commit()
+        release_logins(logins, current_user.organization_id)
 
         logging.info(f"Successfully deleted student with ID: {student_id}")
         return jsonify({"message": "Student deleted successfully"}), 200
@@ -140,3 +143,183 @@ def delete_student(current_user, student_id):
     finally:
         session.close()
 
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def delete_students(session, organization_id, student_ids, delete_events=False):
+    """Set-based delete of an organization's students and their encodings, prototypes and subscriptions.
+
+    Events are deleted too when delete_events is set; otherwise they are kept
+    (counts and history stay intact, listed without a student name) with student_id cleared.
+    The caller commits, then releases the returned logins from the login directory.
+    """
+    logins = []
+    for ids in chunks(list(student_ids), current_app.config['STUDENT_BULK_CHUNK']):
+        logins += session.scalars(select(UserAccount.user_login).where(UserAccount.id.in_(ids))).all()
+        session.execute(delete(FaceEncoding).where(FaceEncoding.user_id.in_(ids)))
+        session.execute(delete(FacePrototype).where(FacePrototype.user_id.in_(ids)))
+        session.execute(delete(Subscription).where(Subscription.organization_id == organization_id,
+                                                   Subscription.student_id.in_(ids)))
+        # event.student_id has no index; the organization filter uses (organization_id, timestamp)
+        events = (Event.organization_id == organization_id, Event.student_id.in_(ids))
+        if delete_events:
+            session.execute(delete(Event).where(*events))
+        else:
+            session.execute(update(Event).where(*events).values(student_id=None))
+        session.execute(delete(UserAccount).where(UserAccount.id.in_(ids)))
+    return logins
+
+
+def read_roster():
+    """Roster rows from an uploaded CSV file or a JSON body ({"students": [...]} or a list)."""
+    if 'file' in request.files:
+        stream = io.TextIOWrapper(request.files['file'].stream, encoding='utf-8-sig')
+        return list(csv.DictReader(stream))
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('students')
+    return data if isinstance(data, list) else None
+
+
+def validate_roster(rows):
+    """Return (students, errors). Login defaults to the student name, as in add_student."""
+    students, errors, seen = [], [], set()
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "message": "Row must be an object"})
+            continue
+
+        invalid = [field for field in ('student_name', 'user_login', 'password')
+                   if row.get(field) is not None and not isinstance(row[field], str)]
+        if invalid:
+            errors.append({"row": number, "message": f"{', '.join(invalid)} must be text"})
+            continue
+
+        student_name = (row.get('student_name') or '').strip()
+        user_login = (row.get('user_login') or student_name).strip()
+        if not student_name:
+            errors.append({"row": number, "message": "Student name is required"})
+            continue
+        if user_login in seen:
+            errors.append({"row": number, "message": f"Duplicate login '{user_login}' in roster"})
+            continue
+
+        seen.add(user_login)
+        students.append({
+            "id": str(uuid4()),
+            "user_name": student_name,
+            "user_role": UserRole.STUDENT,
+            "user_login": user_login,
+            "password_hash": row.get('password') or "default_password",  # Placeholder, as in add_student
+        })
+    return students, errors
+
+
+@students_bp.route('/students/import', methods=['POST'])
+@token_required
+@role_required("ADMIN")
+def import_students(current_user):
+    try:
+        rows = read_roster()
+    except (UnicodeDecodeError, csv.Error):
+        return jsonify({"message": "Invalid CSV file, expected UTF-8 text"}), 400
+    if rows is None:
+        return jsonify({"message": "Provide a CSV file or a JSON list of students"}), 400
+    if len(rows) > current_app.config['STUDENT_IMPORT_MAX_ROWS']:
+        return jsonify({"message": f"Roster is limited to {current_app.config['STUDENT_IMPORT_MAX_ROWS']} students"}), 400
+
+    # Admins import into their own organization; an explicit organization_id must match it
+    data = request.get_json(silent=True)
+    requested = (request.form.get('organization_id') or request.args.get('organization_id')
+                 or (data.get('organization_id') if isinstance(data, dict) else None))
+    if requested and requested != current_user.organization_id:
+        return jsonify({"message": "Permission denied!"}), 403
+    organization_id = current_user.organization_id
+    students, errors = validate_roster(rows)
+
+    session = get_session(organization_id)
+    try:
+        if not session.query(Organization.id).filter_by(id=organization_id).first():
+            return jsonify({"message": "Invalid Organization ID"}), 400
+
+        # One query finds every login that is already taken
+        logins = [student["user_login"] for student in students]
+        taken = set(session.scalars(select(UserAccount.user_login).where(UserAccount.user_login.in_(logins))))
+        if not taken and not errors:
+            # Logins are unique across every shard; this reserves them in the login directory
+            taken = claim_logins(logins, organization_id)
+        errors += [{"login": login, "message": f"Login '{login}' already exists"} for login in logins if login in taken]
+
+        # Nothing is written unless the whole roster is valid
+        if errors:
+            return jsonify({"message": "Roster has errors, nothing was imported", "errors": errors}), 400
+
+        for student in students:
+            student["organization_id"] = organization_id
+        try:
+            for chunk in chunks(students, current_app.config['STUDENT_BULK_CHUNK']):
+                session.execute(insert(UserAccount), chunk)
+            session.commit()
+        except SQLAlchemyError:
+            release_logins(logins, organization_id)
+            raise
+
+        logging.info(f"Imported {len(students)} students into organization {organization_id}")
+        return jsonify({
+            "message": "Students imported successfully",
+            "imported": len(students),
+            "students": [{"student_id": s["id"], "student_name": s["user_name"]} for s in students]
+        }), 201
+
+    except SQLAlchemyError as e:
+        session.rollback()
+        logging.error(f"Error importing students: {str(e)}")
+        return jsonify({"error": "An error occurred while importing the students"}), 500
+    finally:
+        session.close()
+
+
+@students_bp.route('/students/bulk_delete', methods=['POST'])
+@token_required
+@role_required("ADMIN")
+def bulk_delete_students(current_user):
+    data = request.get_json(silent=True) or {}
+    student_ids = data.get('student_ids')
+    if not isinstance(student_ids, list) or not student_ids or not all(isinstance(i, str) for i in student_ids):
+        return jsonify({"message": "student_ids must be a non-empty list of IDs"}), 400
+    delete_events = data.get('delete_events', False)
+    if not isinstance(delete_events, bool):
+        return jsonify({"message": "delete_events must be true or false"}), 400
+
+    session = get_session(current_user.organization_id)
+    try:
+        # Only students of the admin's own organization are deleted
+        found = []
+        for ids in chunks(list(set(student_ids)), current_app.config['STUDENT_BULK_CHUNK']):
+            found += session.scalars(select(UserAccount.id).where(
+                UserAccount.id.in_(ids),
+                UserAccount.organization_id == current_user.organization_id,
+                UserAccount.user_role == UserRole.STUDENT
+            )).all()
+
+        logins = delete_students(session, current_user.organization_id, found, delete_events)
+        session.commit()
+        release_logins(logins, current_user.organization_id)
+
+        logging.info(f"Deleted {len(found)} students by user: {current_user.id}")
+        return jsonify({
+            "message": "Students deleted successfully",
+            "deleted": len(found),
+            "not_found": sorted(set(student_ids) - set(found))
+        }), 200
+
+    except SQLAlchemyError as e:
+        session.rollback()
+        logging.error(f"Error deleting students: {str(e)}")
+        return jsonify({"error": "An error occurred while deleting the students"}), 500
+    finally:
+        session.close()
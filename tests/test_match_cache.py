@@ -0,0 +1,141 @@
+import itertools
+
+import numpy as np
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from models import Base, Organization, UserAccount, UserRole, FaceEncoding
+from face_encodings import match_cache
+from face_encodings.match_cache import MatchCache, cached_match
+
+STUDENTS = 40
+ENCODINGS = 3
+FRAMES = 5
+# Per-dimension noise of 0.02 puts two frames of one face ~0.32 apart in 128-d,
+# the usual same-person spread of face_recognition embeddings
+FRAME_NOISE = 0.02
+
+CONFIG = {
+    "FACE_MATCH_CACHE": True,
+    "FACE_MATCH_CACHE_SIZE": 100,
+    "FACE_MATCH_CACHE_TTL": 60,
+    "FACE_MATCH_CACHE_RECENT": 4,
+    "FACE_MATCH_CACHE_VERIFY_DISTANCE": 0.4,
+    "FACE_MATCH_TOLERANCE": 0.6,
+    "FACE_PROTOTYPES": False,
+}
+
+
+@pytest.fixture
+def gallery():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    rng = np.random.default_rng(0)
+    faces = rng.normal(0, 0.15, (STUDENTS, 128))
+
+    with Session(engine) as session:
+        session.add(Organization(id="org", org_name="School"))
+        for student, face in enumerate(faces):
+            session.add(UserAccount(id=f"s{student}", organization_id="org", user_name=f"s{student}",
+                                    user_role=UserRole.STUDENT, user_login=f"s{student}", password_hash="x"))
+            for k in range(ENCODINGS):
+                encoding = face + rng.normal(0, FRAME_NOISE, 128)
+                session.add(FaceEncoding(id=f"s{student}-{k}", user_id=f"s{student}", face_encoding=encoding.tobytes()))
+        session.commit()
+        yield session, faces, rng
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(match_cache, "_cache", None)
+
+
+def cache_requests(result):
+    return REGISTRY.get_sample_value("face_match_cache_requests_total", {"result": result}) or 0
+
+
+def test_hit_rate_at_realistic_frame_distance(gallery):
+    session, faces, rng = gallery
+    hits_before = cache_requests("hit")
+
+    frame_distances, lookups = [], 0
+    visitors = np.random.default_rng(1).integers(STUDENTS, size=30)
+    for student in visitors:
+        frames = [faces[student] + rng.normal(0, FRAME_NOISE, 128) for _ in range(FRAMES)]
+        frame_distances += [np.linalg.norm(a - b) for a, b in itertools.pairwise(frames)]
+        for frame in frames:
+            user_id, distance = cached_match(session, "org", "camera-1", frame, CONFIG)
+            assert user_id == f"s{student}"
+            lookups += 1
+
+    assert 0.28 < np.mean(frame_distances) < 0.36
+    # Every frame after the first of each visit should be served from the camera's recent identities
+    hit_rate = (cache_requests("hit") - hits_before) / lookups
+    assert hit_rate >= (FRAMES - 1) / FRAMES - 0.05
+
+
+def test_other_face_falls_through_to_full_search(gallery):
+    session, faces, rng = gallery
+    cached_match(session, "org", "camera-1", faces[0], CONFIG)
+
+    rejected_before = cache_requests("rejected")
+    user_id, _ = cached_match(session, "org", "camera-1", faces[1] + rng.normal(0, FRAME_NOISE, 128), CONFIG)
+    assert user_id == "s1"
+    assert cache_requests("rejected") == rejected_before + 1
+
+
+def test_lookalike_is_not_taken_for_a_recent_student(gallery):
+    session, faces, rng = gallery
+    # A lookalike of s0 within FACE_MATCH_TOLERANCE of s0's encodings
+    direction = rng.normal(0, 1, 128)
+    lookalike = faces[0] + 0.45 * direction / np.linalg.norm(direction)
+    for k in range(ENCODINGS):
+        encoding = lookalike + rng.normal(0, FRAME_NOISE / 4, 128)
+        session.add(FaceEncoding(id=f"twin-{k}", user_id="s1", face_encoding=encoding.tobytes()))
+    session.query(FaceEncoding).filter(FaceEncoding.id.like("s1-%")).delete(synchronize_session=False)
+    session.commit()
+
+    for _ in range(FRAMES):
+        user_id, _ = cached_match(session, "org", "camera-1", faces[0] + rng.normal(0, FRAME_NOISE, 128), CONFIG)
+        assert user_id == "s0"
+    for _ in range(FRAMES):
+        frame = lookalike + rng.normal(0, FRAME_NOISE / 4, 128)
+        user_id, _ = cached_match(session, "org", "camera-1", frame, CONFIG)
+        assert user_id == "s1"
+
+
+def test_requests_without_camera_skip_the_cache(gallery):
+    session, faces, rng = gallery
+    counts_before = [cache_requests(result) for result in ("hit", "miss", "rejected")]
+    for student in (0, 1, 0):
+        user_id, _ = cached_match(session, "org", None, faces[student], CONFIG)
+        assert user_id == f"s{student}"
+    assert [cache_requests(result) for result in ("hit", "miss", "rejected")] == counts_before
+    assert match_cache._cache is None or match_cache._cache.recent(("org", None)) == []
+
+
+def test_size_gauge_follows_expiry_and_discard(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(match_cache.time, "monotonic", lambda: now[0])
+    size = lambda: REGISTRY.get_sample_value("face_match_cache_entries")
+
+    cache = MatchCache(max_size=10, ttl=5, recent=2)
+    cache.put(("org", "a"), "s1")
+    cache.put(("org", "b"), "s2")
+    assert size() == 2
+
+    cache.discard(("org", "b"), "s2")
+    assert size() == 1
+
+    now[0] = 10
+    assert cache.recent(("org", "a")) == []
+    assert size() == 0
+
+
+def test_keeps_only_the_most_recent_identities():
+    cache = MatchCache(max_size=10, ttl=60, recent=2)
+    for user_id in ("s1", "s2", "s1", "s3"):
+        cache.put(("org", "a"), user_id)
+    assert cache.recent(("org", "a")) == ["s3", "s1"]